@@ -1,10 +1,12 @@
 import tkinter as tk
 from tkinter import messagebox
-import json, random
+import random
 from datetime import datetime
+from atmLedger import DEFAULT_ACCOUNT, open_ledger
 
 class SimpleATM:
-    def __init__(self, root):
+    # The screen and keypad; balances, PINs and history live in the ledger
+    def __init__(self, root, ledger=None, account_id=DEFAULT_ACCOUNT):
         self.root = root
         self.root.title("ATM Simulator")
         self.root.geometry("500x700")  # Increased height
@@ -20,13 +22,8 @@ class SimpleATM:
         self.root.configure(bg=self.bg_color)
         
         # Load data
-        self.data_file = "atm_data.json"
-        self.default_data = {
-            "pin": "1234",
-            "balance": 1000,
-            "transactions": []
-        }
-        self.load_data()
+        self.ledger = ledger or open_ledger("atm_data.json")
+        self.account_id = account_id
         
         # Create widgets
         self.create_widgets()
@@ -34,18 +31,6 @@ class SimpleATM:
         # Start with PIN entry
         self.pin_mode()
 
-    def load_data(self):
-        try:
-            with open(self.data_file, 'r') as file:
-                self.data = json.load(file)
-        except FileNotFoundError:
-            self.data = self.default_data
-            self.save_data()
-    
-    def save_data(self):
-        with open(self.data_file, 'w') as file:
-            json.dump(self.data, file, indent=4)
-
     def create_widgets(self):
         # Header
         self.header = tk.Label(self.root, text="ATM SIMULATOR", 
@@ -165,7 +150,7 @@ class SimpleATM:
             self.print_to_screen("Please enter your 4-digit PIN:")
         elif text == "Enter":
             if len(self.entered_pin) == 4:
-                if self.entered_pin == self.data["pin"]:
+                if self.ledger.verify_pin(self.account_id, self.entered_pin):
                     self.menu_mode()
                 else:
                     messagebox.showerror("Error", "Incorrect PIN")
@@ -208,7 +193,7 @@ class SimpleATM:
             self.print_to_screen("Enter current PIN:")
         elif text == "Enter":
             if len(self.old_pin) == 4:
-                if self.old_pin == self.data["pin"]:
+                if self.ledger.verify_pin(self.account_id, self.old_pin):
                     self.current_mode = "change_pin2"
                     self.clear_screen()
                     self.print_to_screen("Enter new 4-digit PIN:")
@@ -272,10 +257,11 @@ class SimpleATM:
             self.print_to_screen(f"Enter this CAPTCHA: {self.captcha_code}")
         elif text == "Enter":
             if self.entered_captcha == self.captcha_code:
-                self.data["pin"] = self.new_pin
-                self.save_data()
-                messagebox.showinfo("Success", "PIN changed successfully!")
-                self.record_transaction("PIN Changed")
+                try:
+                    self.ledger.change_pin(self.account_id, self.old_pin, self.new_pin)
+                    messagebox.showinfo("Success", "PIN changed successfully!")
+                except ValueError as e:
+                    messagebox.showerror("Error", str(e))
                 self.menu_mode()
             else:
                 messagebox.showerror("Error", "Incorrect CAPTCHA")
@@ -286,8 +272,7 @@ class SimpleATM:
 
     def check_balance(self):
         self.clear_screen()
-        self.print_to_screen(f"Current Balance: ${self.data['balance']}")
-        self.record_transaction("Balance Check")
+        self.print_to_screen(f"Current Balance: ${self.ledger.balance(self.account_id)}")
 
     def withdraw_menu(self):
         self.clear_screen()
@@ -296,17 +281,14 @@ class SimpleATM:
         self.current_mode = "withdraw"
 
     def process_withdrawal(self, amount):
-        if amount % 100 != 0:
-            messagebox.showerror("Error", "Amount must be in multiples of $100")
-        elif amount > (self.data['balance'] - 100):
-            messagebox.showerror("Error", "Insufficient funds")
+        try:
+            balance = self.ledger.withdraw(self.account_id, amount)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
         else:
-            self.data['balance'] -= amount
-            self.save_data()
             self.clear_screen()
             self.print_to_screen(f"Withdrew: ${amount}")
-            self.print_to_screen(f"New balance: ${self.data['balance']}")
-            self.record_transaction(f"Withdrawal: ${amount}")
+            self.print_to_screen(f"New balance: ${balance}")
             self.current_mode = "menu"
 
     def deposit_menu(self):
@@ -316,13 +298,15 @@ class SimpleATM:
         self.current_mode = "deposit"
 
     def process_deposit(self, amount):
-        self.data['balance'] += amount
-        self.save_data()
-        self.clear_screen()
-        self.print_to_screen(f"Deposited: ${amount}")
-        self.print_to_screen(f"New balance: ${self.data['balance']}")
-        self.record_transaction(f"Deposit: ${amount}")
-        self.current_mode = "menu"
+        try:
+            balance = self.ledger.deposit(self.account_id, amount)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+        else:
+            self.clear_screen()
+            self.print_to_screen(f"Deposited: ${amount}")
+            self.print_to_screen(f"New balance: ${balance}")
+            self.current_mode = "menu"
 
     def change_pin_menu(self):
         self.clear_screen()
@@ -333,7 +317,7 @@ class SimpleATM:
     def show_statement(self):
         self.clear_screen()
         self.print_to_screen("=== Last 5 Transactions ===")
-        transactions = self.data['transactions'][-5:][::-1]  # Last 5 reversed
+        transactions, balance = self.ledger.statement(self.account_id, 5)  # Newest first
         
         if not transactions:
             self.print_to_screen("No transactions yet")
@@ -344,19 +328,7 @@ class SimpleATM:
                 self.print_to_screen(f"Balance: ${txn['balance']}")
                 self.print_to_screen("-"*40)
         
-        self.print_to_screen(f"Current Balance: ${self.data['balance']}")
-        self.record_transaction("Statement Viewed")
-
-    def record_transaction(self, transaction_type):
-        transaction = {
-            "type": transaction_type,
-            "balance": self.data['balance'],
-            "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
-        self.data['transactions'].append(transaction)
-        if len(self.data['transactions']) > 20:
-            self.data['transactions'] = self.data['transactions'][-20:]
-        self.save_data()
+        self.print_to_screen(f"Current Balance: ${balance}")
 
     def exit_atm(self):
         self.clear_screen()
@@ -368,3 +340,4 @@ if __name__ == "__main__":
     root = tk.Tk()
     atm = SimpleATM(root)
     root.mainloop()
+    atm.ledger.close()
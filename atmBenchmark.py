@@ -0,0 +1,187 @@
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from atmLedger import MIN_LOG_BYTES, AccountStore, Ledger
+from storageUtils import atomic_write_json
+
+# Default share of each operation in the mix
+DEFAULT_MIX = "withdraw=40,deposit=30,balance=20,statement=10"
+
+# Opening balance of every benchmark account: enough that withdrawals
+# rarely hit the overdraft rule
+OPENING_BALANCE = 10 ** 9
+
+PIN = "1234"
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{name}' (use {', '.join(OPERATIONS)})")
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise ValueError(f"Bad weight for '{name}'")
+    if sum(mix.values()) <= 0:
+        raise ValueError("The mix needs at least one positive weight")
+    return mix
+
+
+def account_ids(count):
+    return [str(100000 + i) for i in range(count)]
+
+
+def withdraw(ledger, account_id, rng):
+    ledger.withdraw(account_id, rng.randint(1, 5) * 100)
+
+
+def deposit(ledger, account_id, rng):
+    ledger.deposit(account_id, rng.randint(1, 50) * 10)
+
+
+def balance(ledger, account_id, rng):
+    ledger.balance(account_id)
+
+
+def statement(ledger, account_id, rng):
+    ledger.statement(account_id, 5)
+
+
+OPERATIONS = {"withdraw": withdraw, "deposit": deposit, "balance": balance, "statement": statement}
+
+
+def setup(directory, accounts):
+    # A fresh directory is seeded with one snapshot holding every account;
+    # a reused --dir keeps its data and only gets the accounts it lacks
+    path = os.path.join(directory, "atm_data.json")
+    if not os.path.exists(path) and not os.path.exists(os.path.splitext(path)[0] + ".wal"):
+        accounts = {account_id: {"pin": PIN, "balance": OPENING_BALANCE} for account_id in account_ids(accounts)}
+        atomic_write_json(path, {"seq": 0, "accounts": accounts, "requests": {}})
+        return
+
+    ledger = Ledger(AccountStore(path))
+    for account_id in account_ids(accounts):
+        if account_id not in ledger.store:
+            ledger.open_account(account_id, PIN, OPENING_BALANCE)
+    ledger.close()
+
+
+def run_worker(directory, accounts, threads, operations, mix, min_log_bytes, seed):
+    # One process: `threads` threads sharing one ledger, each running
+    # `operations` operations. Returns ({operation: [latency seconds]},
+    # elapsed seconds, bytes written).
+    store = AccountStore(os.path.join(directory, "atm_data.json"), min_log_bytes=min_log_bytes)
+    ledger = Ledger(store)
+    ids = account_ids(accounts)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    latencies = [{name: [] for name in names} for _ in range(threads)]
+
+    def run(index):
+        rng = random.Random(seed * 1000 + index)
+        timings = latencies[index]
+        for name in rng.choices(names, weights, k=operations):
+            account_id = rng.choice(ids)
+            start = time.perf_counter()
+            try:
+                OPERATIONS[name](ledger, account_id, rng)
+            except ValueError:
+                pass  # overdraft refusals are still operations
+            timings[name].append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    ledger.close()
+    merged = {name: [t for timings in latencies for t in timings[name]] for name in names}
+    return merged, elapsed, store.bytes_written + store.history.bytes_written
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run_benchmark(directory, accounts=100, processes=1, threads=4, operations=1000, mix=None,
+                  min_log_bytes=MIN_LOG_BYTES, seed=1):
+    mix = mix or parse_mix(DEFAULT_MIX)
+    setup(directory, accounts)
+
+    if processes > 1:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(run_worker, directory, accounts, threads, operations, mix, min_log_bytes,
+                                       seed + i) for i in range(processes)]
+            results = [future.result() for future in futures]
+    else:
+        results = [run_worker(directory, accounts, threads, operations, mix, min_log_bytes, seed)]
+    # Timed inside the workers, so process start-up is not counted
+    elapsed = max(worker_elapsed for _, worker_elapsed, _ in results)
+
+    rows = []
+    for name in mix:
+        timings = sorted(t for latencies, _, _ in results for t in latencies[name])
+        rows.append({"operation": name, "count": len(timings), "ops_per_sec": len(timings) / elapsed,
+                     "p50_ms": percentile(timings, 0.50) * 1000, "p99_ms": percentile(timings, 0.99) * 1000})
+
+    total = sum(row["count"] for row in rows)
+    all_timings = sorted(t for latencies, _, _ in results for timings in latencies.values() for t in timings)
+    bytes_written = sum(written for _, _, written in results)
+    rows.append({"operation": "all", "count": total, "ops_per_sec": total / elapsed,
+                 "p50_ms": percentile(all_timings, 0.50) * 1000, "p99_ms": percentile(all_timings, 0.99) * 1000})
+    return {"elapsed": elapsed, "rows": rows, "bytes_written": bytes_written,
+            "bytes_per_op": bytes_written / max(total, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure ATM ledger throughput and latency")
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--processes", type=int, default=1, help="terminal processes sharing the data files")
+    parser.add_argument("--threads", type=int, default=4, help="threads per process")
+    parser.add_argument("--operations", type=int, default=1000, help="operations per thread")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation weights")
+    parser.add_argument("--min-log-bytes", type=int, default=MIN_LOG_BYTES,
+                        help="smallest log worth compacting into the snapshot")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--dir", help="data directory to use (default: a temporary one, removed afterwards)")
+    args = parser.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    directory = args.dir or tempfile.mkdtemp(prefix="atm-benchmark-")
+    os.makedirs(directory, exist_ok=True)
+    try:
+        result = run_benchmark(directory, args.accounts, args.processes, args.threads, args.operations, mix,
+                               args.min_log_bytes, args.seed)
+    finally:
+        if not args.dir:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"{args.processes} process(es) x {args.threads} thread(s), {args.accounts} accounts, "
+          f"{result['elapsed']:.2f}s")
+    print(f"{'operation':<10} {'count':>8} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for row in result["rows"]:
+        print(f"{row['operation']:<10} {row['count']:>8} {row['ops_per_sec']:>10.0f} "
+              f"{row['p50_ms']:>9.3f} {row['p99_ms']:>9.3f}")
+    print(f"{result['bytes_written']} bytes written, {result['bytes_per_op']:.0f} bytes/op")
+
+
+if __name__ == "__main__":
+    main()
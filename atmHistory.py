@@ -0,0 +1,173 @@
+import argparse
+import json
+import os
+import sys
+
+from storageUtils import read_lines_reversed
+
+
+class StatementHistory:
+    # Append-only statement entries, one JSON line each, kept outside the
+    # account records in <directory>/<account>/<YYYY-MM>.jsonl. Entries are
+    # written in date order, so the month files double as a time index:
+    # range queries only open the months they cover, and "last N" reads
+    # the newest month backwards.
+    # Entry: {"seq", "date", "type", "amount", "balance"}, where amount is
+    # the signed change to the balance.
+    def __init__(self, directory="atm_history"):
+        self.directory = directory
+        self.bytes_written = 0
+
+    def account_directory(self, account_id):
+        return os.path.join(self.directory, account_id)
+
+    def month_path(self, account_id, month):
+        return os.path.join(self.account_directory(account_id), month + ".jsonl")
+
+    def months(self, account_id):
+        try:
+            names = os.listdir(self.account_directory(account_id))
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len(".jsonl")] for name in names if name.endswith(".jsonl"))
+
+    def append(self, account_id, entry):
+        path = self.month_path(account_id, entry["date"][:7])
+        try:
+            f = open(path, "ab")
+        except FileNotFoundError:
+            os.makedirs(self.account_directory(account_id), exist_ok=True)
+            f = open(path, "ab")
+        line = json.dumps(entry, separators=(",", ":")).encode("utf-8") + b"\n"
+        with f:
+            f.write(line)
+        self.bytes_written += len(line)
+
+    def sync(self, paths):
+        # Make month files durable, before the log that also holds their
+        # entries goes
+        for path in paths:
+            try:
+                with open(path, "rb") as f:
+                    os.fsync(f.fileno())
+            except FileNotFoundError:
+                pass
+
+    def last_seq(self, account_id):
+        months = self.months(account_id)
+        if not months:
+            return 0
+        for line in read_lines_reversed(self.month_path(account_id, months[-1]), 4096):
+            try:
+                return json.loads(line).get("seq", 0)
+            except ValueError:
+                continue  # torn final line
+        return 0
+
+    def read_month(self, account_id, month):
+        try:
+            f = open(self.month_path(account_id, month), "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def last(self, account_id, count):
+        # Newest first
+        entries = []
+        for month in reversed(self.months(account_id)):
+            for line in read_lines_reversed(self.month_path(account_id, month)):
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+                if len(entries) >= count:
+                    return entries
+        return entries
+
+    def between(self, account_id, start=None, end=None):
+        # Oldest first. start/end are inclusive prefixes of the
+        # "%Y-%m-%d %H:%M:%S" dates, e.g. "2026-01" or "2026-01-31".
+        for month in self.months(account_id):
+            if start and month < start[:7] or end and month > end[:7]:
+                continue
+            for entry in self.read_month(account_id, month):
+                date = entry["date"]
+                if start and date[:len(start)] < start:
+                    continue
+                if end and date[:len(end)] > end:
+                    return
+                yield entry
+
+    def opening_balance(self, account_id, month):
+        # Balance before the first entry of the month
+        for entry in self.read_month(account_id, month):
+            return entry["balance"] - entry.get("amount", 0)
+
+        earlier = [m for m in self.months(account_id) if m < month]
+        if earlier:
+            for line in read_lines_reversed(self.month_path(account_id, earlier[-1])):
+                try:
+                    return json.loads(line)["balance"]
+                except ValueError:
+                    continue
+        return 0
+
+    def monthly_statement(self, account_id, month):
+        # Streams one month: opening/closing balance, totals and entries
+        statement = {"account": account_id, "month": month, "opening_balance": self.opening_balance(account_id, month),
+                     "deposits": 0, "withdrawals": 0, "entries": []}
+        statement["closing_balance"] = statement["opening_balance"]
+
+        for entry in self.read_month(account_id, month):
+            amount = entry.get("amount", 0)
+            if amount > 0:
+                statement["deposits"] += amount
+            elif amount < 0:
+                statement["withdrawals"] -= amount
+            statement["closing_balance"] = entry["balance"]
+            statement["entries"].append(entry)
+        return statement
+
+
+def print_entries(entries):
+    for entry in entries:
+        print(f"{entry['date']}  {entry['type']:<24} {entry.get('amount', 0):>10}  balance {entry['balance']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query ATM statement history")
+    parser.add_argument("account")
+    parser.add_argument("--history", default="atm_history", help="history directory")
+    parser.add_argument("--last", type=int, help="show the last N entries")
+    parser.add_argument("--from", dest="start", help="first date to show, e.g. 2026-01 or 2026-01-15")
+    parser.add_argument("--to", dest="end", help="last date to show")
+    parser.add_argument("--month", help="print the monthly statement for YYYY-MM")
+    args = parser.parse_args()
+
+    history = StatementHistory(args.history)
+    if not history.months(args.account):
+        parser.exit(1, f"error: no history for account {args.account}\n")
+
+    if args.month:
+        statement = history.monthly_statement(args.account, args.month)
+        print(f"Account {args.account} - statement for {args.month}")
+        print(f"Opening balance: ${statement['opening_balance']}")
+        print_entries(statement["entries"])
+        print(f"Deposits: ${statement['deposits']}  Withdrawals: ${statement['withdrawals']}")
+        print(f"Closing balance: ${statement['closing_balance']}")
+    elif args.last:
+        print_entries(reversed(history.last(args.account, args.last)))
+    else:
+        try:
+            print_entries(history.between(args.account, args.start, args.end))
+        except BrokenPipeError:
+            sys.stderr.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,497 @@
+import glob
+import json
+import os
+import threading
+from datetime import datetime
+
+from atmHistory import StatementHistory
+from storageUtils import FileLock, atomic_write_json, fsync_directory
+
+# Account the single-user ATM screen works on, and the one the old
+# single-account atm_data.json is migrated into
+DEFAULT_ACCOUNT = "1001"
+
+# Withdrawals come in notes of this size, and must leave this much behind
+NOTE_SIZE = 100
+MINIMUM_BALANCE = 100
+
+# Request ids remembered for retries, across all accounts
+REQUEST_MEMORY = 10000
+
+# The log is compacted into the snapshot once it is bigger than this share
+# of the snapshot, but not while it is smaller than MIN_LOG_BYTES
+COMPACT_RATIO = 0.5
+MIN_LOG_BYTES = 1024 * 1024
+
+
+class AccountStore:
+    # All accounts in memory, keyed by account number. Every change is a
+    # record appended to a write-ahead log. Once the log outgrows
+    # `compact_ratio` of the snapshot file ({"seq", "accounts": {number:
+    # {"pin", "balance"}}, "requests"}), and is at least `min_log_bytes`,
+    # it is sealed (renamed to <log>.<last seq>) and a new one started. A
+    # background thread then folds the sealed logs into a new snapshot and
+    # deletes them, so the snapshot is never written inside the critical
+    # section, and rewriting it costs a bounded share of the bytes logged.
+    # Statement entries go to the StatementHistory, not the account records.
+    #
+    # Records carry the resulting state ({"seq", "account", "balance",
+    # "amount", "type", "date", optional "pin" and "request"}), so replaying
+    # one is idempotent, and records already in the snapshot (seq <= its
+    # seq) are skipped: a crash at any point neither loses an acknowledged
+    # debit nor applies it twice.
+    #
+    # Several threads and processes can share the files. Each change is
+    # checked and logged inside a short critical section under a lock file,
+    # after catching up on records other processes have logged; the fsync
+    # happens after the lock is released and covers every record written
+    # so far, so concurrent writers share one fsync instead of queueing for
+    # one each.
+    def __init__(self, path="atm_data.json", wal_path=None, compact_ratio=COMPACT_RATIO,
+                 min_log_bytes=MIN_LOG_BYTES, history=None):
+        root = os.path.splitext(path)[0]
+        self.path = path
+        self.wal_path = wal_path or root + ".wal"
+        self.compact_ratio = compact_ratio
+        self.min_log_bytes = min_log_bytes
+        self.history = history or StatementHistory(os.path.join(os.path.dirname(path), "atm_history"))
+        self.lock = FileLock(root + ".lock")
+        # Held while compacting, so one process at a time rewrites the
+        # snapshot; taken before self.lock, never inside it
+        self.compact_lock = FileLock(root + ".compact.lock")
+        self.sync_lock = threading.Lock()
+        self.accounts = {}
+        self.requests = {}  # request id -> record, for the last REQUEST_MEMORY requests
+        self.seq = 0
+        self.synced_seq = 0
+        self.wal = None
+        self.log_inode = None  # the log file we are reading and appending to
+        self.wal_offset = 0  # end of the last complete record we have read or written
+        self.compactions = []  # background compaction threads
+        self.bytes_written = 0  # log and snapshot bytes written by this process
+        with self.lock:
+            self.load()
+
+    def load(self):
+        self.accounts, self.requests, self.seq = read_snapshot(self.path)
+        self.migrate_transactions()
+
+        # Sealed logs not compacted yet, then the live one
+        sealed = self.sealed_logs()
+        records = []
+        for log_path in sealed:
+            records += read_log(log_path)[0]
+        self.open_log()
+        more, self.wal_offset = read_log(self.wal_path, truncate=True)
+        self.apply_records(records + more, recovering=True)
+
+        if sealed:
+            self.start_compaction()  # left over from a crash
+
+    def migrate_transactions(self):
+        # Move statement entries kept in the account records (capped at 20)
+        # into the history, then drop them from the snapshot
+        legacy = [account_id for account_id, account in self.accounts.items() if "transactions" in account]
+        if not legacy:
+            return
+
+        months = set()
+        for account_id in legacy:
+            transactions = self.accounts[account_id].pop("transactions")
+            if self.history.months(account_id):
+                continue  # already moved before a crash
+            for entry in transactions:
+                self.history.append(account_id, {"seq": 0, "date": entry["date"], "type": entry["type"],
+                                                 "amount": legacy_amount(entry["type"]),
+                                                 "balance": entry["balance"]})
+                months.add(self.history.month_path(account_id, entry["date"][:7]))
+        self.history.sync(months)
+        self.save_snapshot()
+
+    def sealed_logs(self):
+        # Oldest first; the suffix is the seq of the last record inside
+        pattern = glob.escape(self.wal_path) + ".[0-9]*"
+        return sorted(glob.glob(pattern), key=lambda log_path: int(log_path.rpartition(".")[2]))
+
+    def open_log(self):
+        # (Re)open the live log for appending, e.g. after another process
+        # sealed the one we had open
+        wal = open(self.wal_path, "ab")
+        with self.sync_lock:
+            if self.wal is not None:
+                # Our records in the old file are acknowledged after an
+                # fsync of self.wal; do it now, before losing the handle
+                os.fsync(self.wal.fileno())
+                self.wal.close()
+                self.synced_seq = max(self.synced_seq, self.seq)
+            self.wal = wal
+        self.log_inode = os.fstat(wal.fileno()).st_ino
+
+    def catch_up(self):
+        # Apply records logged since we last looked (by other processes).
+        # Called with the lock held.
+        try:
+            stat = os.stat(self.wal_path)
+        except FileNotFoundError:
+            stat = None
+
+        records = []
+        if stat is None or stat.st_ino != self.log_inode:
+            # Our log was sealed: finish it and any sealed after it. If it
+            # was already compacted away, start again from the snapshot.
+            sealed = self.sealed_logs()
+            inodes = [os.stat(log_path).st_ino for log_path in sealed]
+            if self.log_inode not in inodes:
+                self.load()
+                return
+            first = inodes.index(self.log_inode)
+            records = read_log(sealed[first], self.wal_offset)[0]
+            for log_path in sealed[first + 1:]:
+                records += read_log(log_path)[0]
+            self.open_log()
+            self.wal_offset = 0
+        elif stat.st_size == self.wal_offset:
+            return
+
+        # A torn final record, left by a writer that died mid-append, is
+        # cut off so the next append starts on a clean line
+        more, self.wal_offset = read_log(self.wal_path, self.wal_offset, truncate=True)
+        self.apply_records(records + more)
+
+    def apply_records(self, records, recovering=False):
+        records = [record for record in records if record["seq"] > self.seq]
+
+        # A writer that dies between logging a record and adding it to the
+        # history can only have done so for the newest record; on startup
+        # check every replayed record, since the snapshot may be old
+        history_seqs = {}
+        for i, record in enumerate(records):
+            account_id = record["account"]
+            write_history = False
+            if recovering or i == len(records) - 1:
+                if account_id not in history_seqs:
+                    history_seqs[account_id] = self.history.last_seq(account_id)
+                write_history = record["seq"] > history_seqs[account_id]
+            self.apply(record, write_history)
+            self.seq = record["seq"]
+
+    def apply(self, record, write_history=True):
+        apply_record(self.accounts, self.requests, record)
+        if write_history and record.get("type"):
+            self.history.append(record["account"], {"seq": record["seq"], "date": record["date"],
+                                                    "type": record["type"], "amount": record.get("amount", 0),
+                                                    "balance": record["balance"]})
+
+    def commit(self, account_id, build, request_id=None, create=False, operation=None):
+        # build(account) checks the operation against the latest state and
+        # returns the record to log, or raises ValueError. A request id seen
+        # before returns the record it produced instead of applying again,
+        # provided it was for the same account and (type, amount) operation.
+        with self.lock:
+            self.catch_up()
+
+            record = self.requests.get(request_id) if request_id is not None else None
+            if record is not None:
+                if record["account"] != account_id:
+                    raise ValueError("Request id already used for another account")
+                if operation is not None and (record.get("type"), record.get("amount")) != operation:
+                    raise ValueError("Request id already used for a different transaction")
+            else:
+                account = self.accounts.get(account_id)
+                if create and account is not None:
+                    raise ValueError("Account already exists")
+                if not create and account is None:
+                    raise ValueError("Account not found")
+
+                record = build(account)
+                record["account"] = account_id
+                if request_id is not None:
+                    record["request"] = request_id
+                self.append(record)
+
+        self.sync(record["seq"])
+        return record
+
+    def append(self, record):
+        record["seq"] = self.seq + 1
+        line = json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+        self.wal.write(line)
+        self.wal.flush()
+        self.wal_offset += len(line)
+        self.bytes_written += len(line)
+
+        self.seq = record["seq"]
+        self.apply(record)
+        if self.wal_offset >= self.min_log_bytes and self.wal_offset > self.compact_ratio * snapshot_size(self.path):
+            self.seal_log()
+            self.start_compaction()
+
+    def sync(self, seq):
+        # Durable before it is acknowledged. Whoever gets here first
+        # fsyncs everything written so far, for the threads behind it too.
+        with self.sync_lock:
+            if self.synced_seq >= seq:
+                return
+            target = self.seq
+            os.fsync(self.wal.fileno())
+            self.synced_seq = max(self.synced_seq, target)
+
+    def save_snapshot(self):
+        atomic_write_json(self.path, {"seq": self.seq, "accounts": self.accounts, "requests": self.requests})
+        self.bytes_written += os.path.getsize(self.path)
+
+    def seal_log(self):
+        # Called with the lock held, after an append
+        os.rename(self.wal_path, f"{self.wal_path}.{self.seq}")
+        fsync_directory(os.path.dirname(os.path.abspath(self.wal_path)))
+        self.open_log()
+        self.wal_offset = 0
+
+    def start_compaction(self):
+        self.compactions = [thread for thread in self.compactions if thread.is_alive()]
+        thread = threading.Thread(target=self.compact, daemon=True)
+        thread.start()
+        self.compactions.append(thread)
+
+    def compact(self):
+        # Fold the sealed logs into a new snapshot, built from the files
+        # alone so the lock is only needed to delete them afterwards. A
+        # crash before the delete leaves logs the snapshot already covers,
+        # which replay skips.
+        with self.compact_lock:
+            sealed = self.sealed_logs()
+            if not sealed:
+                return
+
+            accounts, requests, seq = read_snapshot(self.path)
+            months = set()
+            for log_path in sealed:
+                for record in read_log(log_path)[0]:
+                    if record["seq"] <= seq:
+                        continue
+                    apply_record(accounts, requests, record)
+                    seq = record["seq"]
+                    if record.get("type"):
+                        months.add(self.history.month_path(record["account"], record["date"][:7]))
+
+            # The history entries must be durable before the only other
+            # copy of them goes
+            self.history.sync(months)
+            atomic_write_json(self.path, {"seq": seq, "accounts": accounts, "requests": requests})
+
+            with self.lock:
+                self.bytes_written += os.path.getsize(self.path)
+                for log_path in sealed:
+                    os.remove(log_path)
+
+    def checkpoint(self):
+        # Seal the log and compact it now, waiting for the new snapshot
+        with self.lock:
+            self.catch_up()
+            if self.wal_offset:
+                self.seal_log()
+        self.compact()
+
+    def close(self):
+        for thread in self.compactions:
+            thread.join()
+        self.compactions = []
+        if self.wal.closed:
+            return
+        self.sync(self.seq)
+        self.wal.close()
+
+    def __contains__(self, account_id):
+        with self.lock:
+            self.catch_up()
+            return account_id in self.accounts
+
+    def __len__(self):
+        with self.lock:
+            self.catch_up()
+            return len(self.accounts)
+
+    def get(self, account_id):
+        # A copy of the account as of now
+        with self.lock:
+            self.catch_up()
+            account = self.accounts.get(account_id)
+            if account is None:
+                raise ValueError("Account not found")
+            return dict(account)
+
+
+def read_snapshot(path):
+    # (accounts, requests, seq) from a snapshot file
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        data = {"accounts": {}}
+
+    if "accounts" not in data:
+        # Single-account file from before the ledger
+        return {DEFAULT_ACCOUNT: data}, {}, 0
+    return data["accounts"], data.get("requests", {}), data.get("seq", 0)
+
+
+def snapshot_size(path):
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+def read_log(path, offset=0, truncate=False):
+    # Complete records from offset on, and the offset just past them.
+    # Reading stops at a torn or garbled record, which `truncate` cuts off.
+    try:
+        f = open(path, "rb+" if truncate else "rb")
+    except FileNotFoundError:
+        return [], 0
+
+    records = []
+    good_bytes = offset
+    with f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            good_bytes += len(line)
+            records.append(record)
+
+        if truncate and os.fstat(f.fileno()).st_size > good_bytes:
+            f.truncate(good_bytes)
+    return records, good_bytes
+
+
+def apply_record(accounts, requests, record):
+    account = accounts.setdefault(record["account"], {"pin": None, "balance": 0})
+    if "pin" in record:
+        account["pin"] = record["pin"]
+    account["balance"] = record["balance"]
+
+    if "request" in record:
+        requests[record["request"]] = record
+        if len(requests) > REQUEST_MEMORY:
+            del requests[next(iter(requests))]
+
+
+class Ledger:
+    # ATM business rules, independent of any UI. Every operation that
+    # changes or reads an account records a statement entry, logged as a
+    # single write-ahead record. Rules are checked inside the store's
+    # commit, against the latest balance, so they hold with any number of
+    # terminals. Withdrawals and deposits take an optional request id:
+    # retrying with the same id (say after a timeout) never moves money
+    # twice, and returns the balance the first attempt left. Reusing an id
+    # for a different transaction is refused.
+    def __init__(self, store):
+        self.store = store
+
+    def open_account(self, account_id, pin, balance=0):
+        check_pin_format(pin)
+        self.store.commit(account_id, lambda account: make_record(None, balance, balance, pin=pin), create=True)
+
+    def verify_pin(self, account_id, pin):
+        try:
+            return self.store.get(account_id)["pin"] == pin
+        except ValueError:
+            return False
+
+    def balance(self, account_id):
+        record = self.store.commit(account_id, lambda account: make_record(
+            "Balance Check", account["balance"], 0))
+        return record["balance"]
+
+    def withdraw(self, account_id, amount, request_id=None):
+        if amount < 0 or amount % NOTE_SIZE != 0:
+            raise ValueError(f"Amount must be in multiples of ${NOTE_SIZE}")
+
+        transaction_type = f"Withdrawal: ${amount}"
+
+        def build(account):
+            if amount > account["balance"] - MINIMUM_BALANCE:
+                raise ValueError("Insufficient funds")
+            return make_record(transaction_type, account["balance"] - amount, -amount)
+
+        return self.store.commit(account_id, build, request_id,
+                                 operation=(transaction_type, -amount))["balance"]
+
+    def deposit(self, account_id, amount, request_id=None):
+        if amount < 0:
+            raise ValueError("Amount cannot be negative")
+
+        transaction_type = f"Deposit: ${amount}"
+        return self.store.commit(account_id, lambda account: make_record(
+            transaction_type, account["balance"] + amount, amount), request_id,
+            operation=(transaction_type, amount))["balance"]
+
+    def change_pin(self, account_id, old_pin, new_pin):
+        check_pin_format(new_pin)
+
+        def build(account):
+            if account["pin"] != old_pin:
+                raise ValueError("Incorrect current PIN")
+            return make_record("PIN Changed", account["balance"], 0, pin=new_pin)
+
+        self.store.commit(account_id, build)
+
+    def statement(self, account_id, count=5):
+        # Newest first, with the current balance
+        self.store.get(account_id)
+        entries = self.store.history.last(account_id, count)
+        record = self.store.commit(account_id, lambda account: make_record(
+            "Statement Viewed", account["balance"], 0))
+        return entries, record["balance"]
+
+    def history(self, account_id, start=None, end=None):
+        # Every entry between two dates, oldest first, read lazily
+        self.store.get(account_id)
+        return self.store.history.between(account_id, start, end)
+
+    def monthly_statement(self, account_id, month):
+        self.store.get(account_id)
+        return self.store.history.monthly_statement(account_id, month)
+
+    def close(self):
+        self.store.close()
+
+
+def make_record(transaction_type, balance, amount, **changes):
+    record = {"balance": balance, "amount": amount, "type": transaction_type,
+              "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+    record.update(changes)
+    return record
+
+
+def check_pin_format(pin):
+    if len(pin) != 4 or not pin.isdigit():
+        raise ValueError("PIN must be 4 digits")
+
+
+def legacy_amount(transaction_type):
+    # Signed amount of an entry recorded before amounts were stored
+    kind, _, amount = transaction_type.partition(": $")
+    if kind == "Withdrawal" and amount.isdigit():
+        return -int(amount)
+    if kind == "Deposit" and amount.isdigit():
+        return int(amount)
+    return 0
+
+
+def open_ledger(path="atm_data.json"):
+    store = AccountStore(path)
+    ledger = Ledger(store)
+    if DEFAULT_ACCOUNT not in store:
+        try:
+            ledger.open_account(DEFAULT_ACCOUNT, "1234", 1000)
+        except ValueError:
+            # Another terminal starting at the same moment got there first
+            if DEFAULT_ACCOUNT not in store:
+                raise
+    return ledger
@@ -0,0 +1,224 @@
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+from storageUtils import fsync_directory, match_file_mode
+from inventoryStore import InventoryRepository, TransactionJournal, validate_product_fields
+
+# Column order used for CSV export (and accepted on CSV import)
+PRODUCT_FIELDS = ["id", "name", "category", "price", "quantity", "min_stock", "description", "last_updated"]
+
+# Products written and journalled per commit during import
+IMPORT_BATCH_SIZE = 5000
+
+# Products fetched from the repository per read during export
+EXPORT_CHUNK_SIZE = 5000
+
+
+def file_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    raise ValueError(f"Unsupported file type '{extension}' (use .csv or .jsonl)")
+
+
+class ByteCounter:
+    # Iterates a binary file as text lines while counting the bytes consumed,
+    # so progress can be reported against the file size
+    def __init__(self, f):
+        self.f = f
+        self.bytes_read = 0
+
+    def __iter__(self):
+        for raw in self.f:
+            if not self.bytes_read and raw.startswith(b"\xef\xbb\xbf"):
+                raw = raw[3:]
+                self.bytes_read += 3
+            self.bytes_read += len(raw)
+            yield raw.decode("utf-8")
+
+
+def read_rows(f, fmt):
+    # Yields (line number, raw field mapping, None) one row at a time, or
+    # (line number, None, error) for a line that cannot be parsed, so one bad
+    # line is reported like an invalid row instead of stopping the import
+    if fmt == "csv":
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+
+    for line_number, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, None, "invalid JSON"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, "expected a JSON object"
+            continue
+        yield line_number, row, None
+
+
+def import_products(repository, journal, path, user=None, batch_size=IMPORT_BATCH_SIZE, progress=None):
+    # Streams products from a CSV/JSONL file into the repository. Rows are
+    # validated with the product form's rules; invalid rows are skipped and
+    # reported. Each batch gets one block of new ids, one commit and one
+    # journal entry. Ids in the file are ignored.
+    # progress(bytes_read, total_bytes, imported, errors) is called per batch.
+    fmt = file_format(path)
+    total_bytes = os.path.getsize(path)
+    result = {"imported": 0, "errors": [], "first_id": None, "last_id": None}
+
+    def commit(batch):
+        products = repository.add_many(batch)
+        result["imported"] += len(products)
+        result["first_id"] = result["first_id"] or products[0]["id"]
+        result["last_id"] = products[-1]["id"]
+
+        journal.append({
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "user": user,
+            "action": "IMPORT",
+            "product_id": None,
+            "product_name": f"{len(products)} products",
+            "details": {
+                "source": os.path.basename(path),
+                "count": len(products),
+                "first_id": products[0]["id"],
+                "last_id": products[-1]["id"]
+            }
+        })
+
+    with open(path, "rb") as f:
+        counter = ByteCounter(f)
+        batch = []
+        for line_number, row, error in read_rows(counter, fmt):
+            if error is not None:
+                result["errors"].append((line_number, error))
+                continue
+            try:
+                batch.append(validate_product_fields(row))
+            except ValueError as e:
+                result["errors"].append((line_number, str(e)))
+
+            if len(batch) >= batch_size:
+                commit(batch)
+                batch = []
+                if progress:
+                    progress(counter.bytes_read, total_bytes, result["imported"], len(result["errors"]))
+
+        if batch:
+            commit(batch)
+        if progress:
+            progress(total_bytes, total_bytes, result["imported"], len(result["errors"]))
+
+    return result
+
+
+def export_products(repository, path, chunk_size=EXPORT_CHUNK_SIZE, progress=None):
+    # Streams every product to CSV/JSONL in id order, reading the repository
+    # a chunk at a time. The file is written beside the target and renamed
+    # over it once complete. progress(exported, total) is called per chunk.
+    fmt = file_format(path)
+    ids = sorted(repository.ids())
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+
+    try:
+        match_file_mode(fd, path)
+        with io.open(fd, "w", newline="", encoding="utf-8") as f:
+            if fmt == "csv":
+                writer = csv.DictWriter(f, fieldnames=PRODUCT_FIELDS, extrasaction="ignore")
+                writer.writeheader()
+
+            for start in range(0, len(ids), chunk_size):
+                products = repository.get_many(ids[start:start + chunk_size])
+                if fmt == "csv":
+                    writer.writerows(products)
+                else:
+                    f.writelines(json.dumps(p, separators=(",", ":")) + "\n" for p in products)
+                if progress:
+                    progress(min(start + chunk_size, len(ids)), len(ids))
+
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    fsync_directory(directory)
+    return len(ids)
+
+
+def open_backend(backend, inventory_path, db_path, transactions_path, service_address):
+    if backend == "service":
+        import inventoryServer
+
+        repository, journal, _ = inventoryServer.connect_backend(service_address)
+        return repository, journal
+    if backend == "sqlite":
+        import inventorySQLite
+
+        repository, journal, _ = inventorySQLite.open_backend(db_path, inventory_path, transactions_path)
+        return repository, journal
+
+    return InventoryRepository(inventory_path), TransactionJournal(transactions_path)
+
+
+def print_progress(message):
+    sys.stderr.write("\r" + message)
+    sys.stderr.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import/export InventoryPro products (CSV or JSONL)")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("file", help="a .csv or .jsonl file")
+    parser.add_argument("--backend", choices=["json", "sqlite", "service"],
+                        default=os.environ.get("INVENTORY_BACKEND", "json"))
+    parser.add_argument("--inventory", default="inventory.json")
+    parser.add_argument("--db", default="inventory.db")
+    parser.add_argument("--service", default=os.environ.get("INVENTORY_SERVICE", "127.0.0.1:8765"),
+                        help="host:port of the inventory service")
+    parser.add_argument("--transactions", default="transactions.jsonl")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument("--user", default=None, help="user recorded in the journal entries")
+    args = parser.parse_args()
+
+    repository, journal = open_backend(args.backend, args.inventory, args.db, args.transactions, args.service)
+    try:
+        if args.command == "import":
+            result = import_products(
+                repository, journal, args.file, args.user, args.batch_size,
+                lambda done, total, imported, errors: print_progress(
+                    f"{done * 100 // max(total, 1)}% - {imported} imported, {errors} rejected"))
+            print(file=sys.stderr)
+            for line_number, error in result["errors"]:
+                print(f"{args.file}:{line_number}: {error}", file=sys.stderr)
+            print(f"Imported {result['imported']} products, rejected {len(result['errors'])}")
+        else:
+            count = export_products(repository, args.file, progress=lambda done, total: print_progress(
+                f"{done}/{total} exported"))
+            print(file=sys.stderr)
+            print(f"Exported {count} products to {args.file}")
+    except ValueError as e:
+        parser.exit(1, f"error: {e}\n")
+    finally:
+        journal.close()
+
+
+if __name__ == "__main__":
+    main()
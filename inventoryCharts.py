@@ -0,0 +1,312 @@
+import base64
+import io
+import math
+import threading
+
+import matplotlib
+import numpy as np
+from matplotlib.figure import Figure
+
+# Pie layout used by every report (matches the Axes.pie defaults we rely on)
+PIE_START_ANGLE = 90
+PIE_LABEL_DISTANCE = 1.1
+PIE_PCT_DISTANCE = 0.6
+
+
+class ChartManager:
+    # One persistent Figure per report. Revisiting a report updates the
+    # existing artists in place when the chart's shape is unchanged, and only
+    # redraws the axes when it is not. Figures are created without pyplot so
+    # they are never registered with (or leaked by) pyplot's figure manager.
+    def __init__(self):
+        self.figures = {}
+        self.artists = {}  # report key -> artists from the last full draw
+        self.widgets = {}  # report key -> Tk widget currently showing the chart
+        self.locks = {}
+        self.locks_guard = threading.Lock()
+
+    def lock(self, key):
+        # Held by whichever thread is drawing/rendering a report's figure
+        with self.locks_guard:
+            return self.locks.setdefault(key, threading.Lock())
+
+    def figure(self, key, figsize, dpi=80):
+        fig = self.figures.get(key)
+        if fig is None:
+            fig = Figure(figsize=figsize, dpi=dpi)
+            self.figures[key] = fig
+        return fig
+
+    def show(self, key, parent):
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        # Tk widgets cannot be re-parented, so each visit gets a fresh canvas
+        # widget around the same Figure
+        self.release(key)
+        canvas = FigureCanvasTkAgg(self.figures[key], parent)
+        canvas.draw()
+        canvas.get_tk_widget().pack(fill="both", expand=True)
+        self.widgets[key] = canvas.get_tk_widget()
+        return canvas
+
+    def render_png(self, key):
+        # Off-screen Agg render; safe to call from a worker thread
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        fig = self.figures[key]
+        if not isinstance(fig.canvas, FigureCanvasAgg):
+            FigureCanvasAgg(fig)
+        buffer = io.BytesIO()
+        fig.canvas.print_png(buffer)
+        return buffer.getvalue()
+
+    def show_png(self, key, parent, png):
+        import tkinter as tk
+
+        self.release(key)
+        image = tk.PhotoImage(master=parent, data=base64.b64encode(png))
+        label = tk.Label(parent, image=image, borderwidth=0)
+        label.image = image  # keep a reference for Tk
+        label.pack(fill="both", expand=True)
+        self.widgets[key] = label
+        return label
+
+    def release(self, key):
+        widget = self.widgets.pop(key, None)
+        if widget is not None and widget.winfo_exists():
+            widget.destroy()
+
+    def release_all(self):
+        for key in list(self.widgets):
+            self.release(key)
+
+    def pie(self, key, labels, values, title, figsize=(10, 6), explode_first=False, colormap=None,
+            textprops=None, title_style=None):
+        fig = self.figure(key, figsize)
+        labels = list(labels)
+        values = [float(v) for v in values]
+        artists = self.artists.get(key)
+
+        if sum(values) <= 0:
+            self.draw_empty(key, fig, title)
+        elif artists and artists["kind"] == "pie" and artists["labels"] == labels:
+            update_pie(artists, values)
+        else:
+            fig.clear()
+            ax = fig.add_subplot(111)
+
+            explode = [0.1 if explode_first and i == 0 else 0 for i in range(len(labels))]
+            colors = None
+            if colormap:
+                colors = matplotlib.colormaps[colormap](np.linspace(0, 1, len(labels)))
+
+            wedges, texts, autotexts = ax.pie(
+                values, labels=labels, autopct='%1.1f%%', shadow=True, startangle=PIE_START_ANGLE,
+                explode=explode, colors=colors, textprops=textprops)
+            ax.axis('equal')  # Equal aspect ratio ensures pie is drawn as a circle
+            ax.set_title(title, **(title_style or {}))
+
+            self.artists[key] = {"kind": "pie", "labels": labels, "explode": explode,
+                                 "wedges": wedges, "texts": texts, "autotexts": autotexts}
+        return fig
+
+    def grouped_bars(self, key, names, series, title, xlabel, ylabel, figsize=(10, 6)):
+        # series: [(label, values, color), ...] drawn side by side per name
+        fig = self.figure(key, figsize)
+        names = list(names)
+        artists = self.artists.get(key)
+
+        if artists and artists["kind"] == "grouped_bars" and artists["size"] == len(names) \
+                and len(artists["containers"]) == len(series):
+            ax = artists["ax"]
+            for container, (_, values, _) in zip(artists["containers"], series):
+                for bar, value in zip(container, values):
+                    bar.set_height(value)
+            if artists["names"] != names:
+                ax.set_xticklabels(names, rotation=45, ha='right', fontsize=10)
+                artists["names"] = names
+                fig.tight_layout()
+            ax.relim()
+            ax.autoscale_view()
+        else:
+            fig.clear()
+            ax = fig.add_subplot(111)
+
+            x = np.arange(len(names))
+            width = 0.7 / max(len(series), 1)
+            containers = []
+            for i, (label, values, color) in enumerate(series):
+                containers.append(ax.bar(x + i * width, values, width, label=label, color=color))
+
+            ax.set_xlabel(xlabel, fontsize=12)
+            ax.set_ylabel(ylabel, fontsize=12)
+            ax.set_title(title, fontsize=14, fontweight='bold')
+            ax.set_xticks(x + width * (len(series) - 1) / 2)
+            ax.set_xticklabels(names, rotation=45, ha='right', fontsize=10)
+            ax.legend(fontsize=10)
+            fig.tight_layout()
+
+            self.artists[key] = {"kind": "grouped_bars", "ax": ax, "size": len(names), "names": names,
+                                 "containers": containers}
+        return fig
+
+    def bar_line(self, key, names, bar_values, line_values, title, xlabel, bar_label, line_label,
+                 bar_legend=None, line_legend=None, bar_color='#4e79a7', line_color='#e15759',
+                 figsize=(10, 6)):
+        # Bars on the left axis, a line on a twin right axis
+        fig = self.figure(key, figsize)
+        names = list(names)
+        x = np.arange(len(names))
+        artists = self.artists.get(key)
+
+        if artists and artists["kind"] == "bar_line" and artists["size"] == len(names):
+            ax1, ax2 = artists["axes"]
+            for bar, value in zip(artists["bars"], bar_values):
+                bar.set_height(value)
+            artists["line"].set_data(x, line_values)
+            if artists["names"] != names:
+                ax1.set_xticklabels(names, rotation=45, ha='right')
+                artists["names"] = names
+                fig.tight_layout()
+            for ax in (ax1, ax2):
+                ax.relim()
+                ax.autoscale_view()
+        else:
+            fig.clear()
+            ax1 = fig.add_subplot(111)
+            bars = ax1.bar(x, bar_values, color=bar_color, alpha=0.7, label=bar_legend or bar_label)
+            ax1.set_xlabel(xlabel, fontsize=12)
+            ax1.set_ylabel(bar_label, color=bar_color, fontsize=12)
+            ax1.tick_params(axis='y', labelcolor=bar_color)
+            ax1.set_xticks(x)
+            ax1.set_xticklabels(names, rotation=45, ha='right')
+
+            ax2 = ax1.twinx()
+            line, = ax2.plot(x, line_values, color=line_color, marker='o', label=line_legend or line_label)
+            ax2.set_ylabel(line_label, color=line_color, fontsize=12)
+            ax2.tick_params(axis='y', labelcolor=line_color)
+
+            ax1.set_title(title, fontsize=14, fontweight='bold')
+
+            # Combine legends from both axes
+            lines, labels = ax1.get_legend_handles_labels()
+            lines2, labels2 = ax2.get_legend_handles_labels()
+            ax2.legend(lines + lines2, labels + labels2, loc='upper right')
+            fig.tight_layout()
+
+            self.artists[key] = {"kind": "bar_line", "axes": (ax1, ax2), "size": len(names),
+                                 "names": names, "bars": bars, "line": line}
+        return fig
+
+    def labelled_bars(self, key, names, values, title, xlabel, ylabel, color='#76b7b2', figsize=(10, 6)):
+        # One bar per name with its value printed on top
+        fig = self.figure(key, figsize)
+        names = list(names)
+        artists = self.artists.get(key)
+
+        if artists and artists["kind"] == "labelled_bars" and artists["size"] == len(names):
+            ax = artists["ax"]
+            for i, (bar, text, value) in enumerate(zip(artists["bars"], artists["labels"], values)):
+                bar.set_height(value)
+                text.set_position((i, value))
+                text.set_text(f"${value:,.0f}")
+                text.set_visible(value > 0)
+            if artists["names"] != names:
+                ax.set_xticklabels(names, rotation=45, ha='right', fontsize=8)
+                artists["names"] = names
+                fig.tight_layout()
+            ax.relim()
+            ax.autoscale_view()
+        else:
+            fig.clear()
+            ax = fig.add_subplot(111)
+
+            pos = np.arange(len(names))
+            bars = ax.bar(pos, values, color=color, edgecolor='black')
+            ax.set_xlabel(xlabel, fontsize=12)
+            ax.set_ylabel(ylabel, fontsize=12)
+            ax.set_title(title, fontsize=14, fontweight='bold')
+            ax.set_xticks(pos)
+            ax.set_xticklabels(names, rotation=45, ha='right', fontsize=8)
+
+            # Add value labels
+            labels = []
+            for i, v in enumerate(values):
+                text = ax.text(i, v, f"${v:,.0f}", ha='center', va='bottom', fontsize=8)
+                text.set_visible(v > 0)
+                labels.append(text)
+            fig.tight_layout()
+
+            self.artists[key] = {"kind": "labelled_bars", "ax": ax, "size": len(names), "names": names,
+                                 "bars": bars, "labels": labels}
+        return fig
+
+    def histogram(self, key, edges, counts, title, xlabel, ylabel, color='#59a14f', figsize=(10, 6)):
+        # Bars spanning each bin on a log-scaled value axis
+        fig = self.figure(key, figsize)
+        artists = self.artists.get(key)
+
+        if not len(counts):
+            self.draw_empty(key, fig, title)
+        elif artists and artists["kind"] == "histogram" and artists["size"] == len(counts):
+            ax = artists["ax"]
+            for bar, left, width, count in zip(artists["bars"], edges[:-1], np.diff(edges), counts):
+                bar.set_x(left)
+                bar.set_width(width)
+                bar.set_height(count)
+            ax.set_xlim(edges[0], edges[-1])
+            ax.relim()
+            ax.autoscale_view(scalex=False)
+        else:
+            fig.clear()
+            ax = fig.add_subplot(111)
+
+            bars = ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', color=color,
+                          edgecolor='black')
+            ax.set_xscale('log')
+            ax.set_xlim(edges[0], edges[-1])
+            ax.set_xlabel(xlabel, fontsize=12)
+            ax.set_ylabel(ylabel, fontsize=12)
+            ax.set_title(title, fontsize=14, fontweight='bold')
+            fig.tight_layout()
+
+            self.artists[key] = {"kind": "histogram", "ax": ax, "size": len(counts), "bars": bars}
+        return fig
+
+    def draw_empty(self, key, fig, title):
+        fig.clear()
+        ax = fig.add_subplot(111)
+        ax.set_title(title)
+        ax.text(0.5, 0.5, "No data", ha='center', va='center', transform=ax.transAxes)
+        ax.axis('off')
+        self.artists[key] = {"kind": "empty"}
+
+
+def update_pie(artists, values):
+    # Same geometry Axes.pie computes, applied to the existing wedges and texts
+    total = sum(values)
+    theta1 = PIE_START_ANGLE / 360
+
+    for i, value in enumerate(values):
+        theta2 = theta1 + value / total
+        thetam = 2 * math.pi * 0.5 * (theta1 + theta2)
+        x = artists["explode"][i] * math.cos(thetam)
+        y = artists["explode"][i] * math.sin(thetam)
+
+        wedge = artists["wedges"][i]
+        wedge.set_center((x, y))
+        wedge.set_theta1(360 * theta1)
+        wedge.set_theta2(360 * theta2)
+
+        text = artists["texts"][i]
+        xt = x + PIE_LABEL_DISTANCE * wedge.r * math.cos(thetam)
+        yt = y + PIE_LABEL_DISTANCE * wedge.r * math.sin(thetam)
+        text.set_position((xt, yt))
+        text.set_horizontalalignment('left' if xt > 0 else 'right')
+
+        autotext = artists["autotexts"][i]
+        autotext.set_position((x + PIE_PCT_DISTANCE * wedge.r * math.cos(thetam),
+                               y + PIE_PCT_DISTANCE * wedge.r * math.sin(thetam)))
+        autotext.set_text('%1.1f%%' % (100 * value / total))
+
+        theta1 = theta2
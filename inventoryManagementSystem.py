@@ -1,13 +1,73 @@
+import time
+STARTUP_T0 = time.perf_counter()
+
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from tkinter import font as tkfont
 import json
 import os
+import sys
+import threading
 from datetime import datetime
-from PIL import Image, ImageTk
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import numpy as np
+from inventoryStore import (ConflictError, InventoryRepository, TransactionJournal, UserStore, 
+                            validate_product_fields)
+import inventorySQLite
+import inventoryBulk
+
+# The charting stack is imported on first use (see load_charting)
+inventoryCharts = None
+inventoryReports = None
+
+# Print a startup timing report with --startup-timing or INVENTORY_STARTUP_TIMING=1
+STARTUP_TIMING = "--startup-timing" in sys.argv or os.environ.get("INVENTORY_STARTUP_TIMING") == "1"
+startup_marks = []
+
+
+def mark_startup(label):
+    startup_marks.append((label, time.perf_counter() - STARTUP_T0))
+    if STARTUP_TIMING:
+        print(f"[startup] {label:<32} {startup_marks[-1][1] * 1000:8.1f} ms")
+
+
+def warm_charting_imports():
+    # Runs in a background thread while the login screen is up; only the
+    # Tk-independent modules are imported here
+    import numpy
+    import matplotlib
+    import matplotlib.figure
+    import matplotlib.backends.backend_agg
+    import inventoryCharts
+    mark_startup("charting warmed (background)")
+
+
+def load_charting():
+    global inventoryCharts, inventoryReports
+    if inventoryCharts is not None:
+        return
+    
+    import inventoryCharts
+    import inventoryReports
+    mark_startup("charting loaded")
+
+
+mark_startup("modules imported")
+
+# Storage backend: "json" (inventory.json + transactions.jsonl), "sqlite"
+# (inventory.db) or "service" (an inventoryServer at INVENTORY_SERVICE)
+STORAGE_BACKEND = os.environ.get("INVENTORY_BACKEND", "json")
+SERVICE_ADDRESS = os.environ.get("INVENTORY_SERVICE", "127.0.0.1:8765")
+
+# The products table only ever holds this many rows, a window onto the
+# full id list that is refilled as the user scrolls
+PRODUCT_WINDOW_ROWS = 200
+
+# Items per page on the low stock report
+LOW_STOCK_PAGE_SIZE = 25
+
+# Value distribution: products drawn before the rest become "Other", and
+# the bin count of the histogram view
+VALUE_TOP_N = 20
+VALUE_HISTOGRAM_BINS = 20
 
 class InventoryManagementSystem:
     def __init__(self, root):
@@ -54,9 +114,26 @@ class InventoryManagementSystem:
         
         # Create data files if they don't exist
         self.init_data_files()
+        if STORAGE_BACKEND == "sqlite":
+            self.inventory, self.journal, self.users = inventorySQLite.open_backend("inventory.db")
+        elif STORAGE_BACKEND == "service":
+            import inventoryServer
+            
+            self.inventory, self.journal, self.users = inventoryServer.connect_backend(SERVICE_ADDRESS)
+        else:
+            self.inventory = InventoryRepository("inventory.json")
+            self.journal = TransactionJournal("transactions.jsonl", legacy_path="transactions.json")
+            self.users = UserStore("users.json")
         
         self.current_user = None
+        self.product_row_ids = []
+        self.product_window_start = 0
+        self.charts = None
+        self.reports = None
+        self.snapshots = None
         self.login_screen()
+        
+        threading.Thread(target=warm_charting_imports, daemon=True).start()
 
     def init_data_files(self):
         if not os.path.exists("users.json"):
@@ -77,10 +154,6 @@ class InventoryManagementSystem:
             ]
             with open("inventory.json", "w") as f:
                 json.dump(sample_inventory, f, indent=2)
-        
-        if not os.path.exists("transactions.json"):
-            with open("transactions.json", "w") as f:
-                json.dump([], f)
 
     def login_screen(self):
         self.clear_window()
@@ -117,16 +190,14 @@ class InventoryManagementSystem:
         username = self.username_entry.get()
         password = self.password_entry.get()
         
-        with open("users.json", "r") as f:
-            users = json.load(f)
-            
-        if username in users and users[username] == password:
+        if self.users.check_password(username, password):
             self.current_user = username
             self.main_dashboard()
         else:
             messagebox.showerror("Login Failed", "Invalid username or password", parent=self.root)
 
     def main_dashboard(self):
+        self.load_charting()
         self.clear_window()
         
         # Configure main window layout
@@ -165,16 +236,17 @@ class InventoryManagementSystem:
         stats_frame = ttk.Frame(content_frame)
         stats_frame.pack(fill="x", pady=(0, 10))
         
-        with open("inventory.json", "r") as f:
-            inventory = json.load(f)
+        category_summary, product_count, total_value, low_stock_count, transactions = self.fetch(
+            ("category_summary",), ("count",), ("total_value",), ("low_stock_count",), 
+            ("journal.recent", 10))  # Newest first
         
         stats_data = [
-            {"title": "Total Products", "value": len(inventory), "color": self.colors["primary"]},
-            {"title": "Inventory Value", "value": f"${sum(p['price']*p['quantity'] for p in inventory):,.2f}", 
+            {"title": "Total Products", "value": product_count, "color": self.colors["primary"]},
+            {"title": "Inventory Value", "value": f"${total_value:,.2f}", 
              "color": self.colors["secondary"]},
-            {"title": "Low Stock Items", "value": sum(1 for p in inventory if p['quantity'] <= p['min_stock']), 
+            {"title": "Low Stock Items", "value": low_stock_count, 
              "color": self.colors["warning"]},
-            {"title": "Categories", "value": len(set(p['category'] for p in inventory)), 
+            {"title": "Categories", "value": len(category_summary), 
              "color": self.colors["dark"]}
         ]
         
@@ -195,26 +267,12 @@ class InventoryManagementSystem:
         chart_frame.pack(fill="both", expand=True, side="left")
         
         # Inventory summary chart
-        fig = plt.figure(figsize=(6, 4), dpi=80)
-        ax = fig.add_subplot(111)
+        labels = list(category_summary.keys())
+        values = [c["total_value"] for c in category_summary.values()]
         
-        categories = {}
-        for product in inventory:
-            if product['category'] not in categories:
-                categories[product['category']] = 0
-            categories[product['category']] += product['price'] * product['quantity']
-        
-        labels = list(categories.keys())
-        values = list(categories.values())
-        explode = [0.1] + [0]*(len(labels)-1)
-        
-        ax.pie(values, labels=labels, autopct='%1.1f%%', shadow=True, startangle=90, explode=explode)
-        ax.axis('equal')  # Equal aspect ratio ensures pie is drawn as a circle
-        ax.set_title('Inventory Value by Category')
-        
-        chart = FigureCanvasTkAgg(fig, chart_frame)
-        chart.draw()
-        chart.get_tk_widget().pack(fill="both", expand=True)
+        self.charts.pie("dashboard", labels, values, 'Inventory Value by Category', 
+                        figsize=(6, 4), explode_first=True)
+        self.charts.show("dashboard", chart_frame)
         
         # Recent transactions table
         trans_frame = ttk.Frame(activity_frame, width=300, padding=(10,0,0,0))
@@ -239,10 +297,7 @@ class InventoryManagementSystem:
         scrollbar.config(command=self.trans_tree.yview)
         
         # Load recent transactions
-        with open("transactions.json", "r") as f:
-            transactions = json.load(f)
-        
-        for transaction in transactions[-10:][::-1]:  # Show last 10, newest first
+        for transaction in transactions:
             self.trans_tree.insert("", "end", values=(
                 transaction["action"],
                 transaction["product_name"],
@@ -264,6 +319,7 @@ class InventoryManagementSystem:
         ttk.Label(filter_frame, text="Search:").pack(side="left", padx=5)
         self.search_entry = ttk.Entry(filter_frame, width=30)
         self.search_entry.pack(side="left", padx=5)
+        self.search_entry.bind("<Return>", lambda e: self.search_products())
         
         ttk.Button(filter_frame, text="Search", style="Secondary.TButton", 
                   command=self.search_products).pack(side="left", padx=5)
@@ -271,20 +327,21 @@ class InventoryManagementSystem:
         ttk.Button(filter_frame, text="Clear", command=self.clear_search).pack(side="left", padx=5)
         
         # Category filter
-        with open("inventory.json", "r") as f:
-            inventory = json.load(f)
-        
-        categories = sorted(set(p["category"] for p in inventory))
+        categories, product_count = self.fetch(("categories",), ("count",))
         ttk.Label(filter_frame, text="Category:").pack(side="left", padx=(20,5))
         
         self.category_var = tk.StringVar()
         self.category_menu = ttk.Combobox(filter_frame, textvariable=self.category_var, 
                                          values=categories, state="readonly")
         self.category_menu.pack(side="left", padx=5)
+        self.category_menu.bind("<<ComboboxSelected>>", lambda e: self.filter_by_category())
         
         ttk.Button(filter_frame, text="Filter", style="Secondary.TButton", 
                   command=self.filter_by_category).pack(side="left", padx=5)
         
+        self.filter_count_label = ttk.Label(filter_frame, text=f"{product_count} products")
+        self.filter_count_label.pack(side="left", padx=(20, 5))
+        
 
 
         btn_frame = ttk.Frame(content_frame)
@@ -305,8 +362,14 @@ class InventoryManagementSystem:
         ttk.Button(btn_frame, text="Remove Stock", style="Danger.TButton", 
                   command=self.remove_stock).pack(side="left", padx=5)
 
+        ttk.Button(btn_frame, text="Batch Stock...", command=self.stock_movements).pack(side="left", padx=5)
+
         ttk.Button(btn_frame, text="Refresh", command=self.load_products).pack(side="right", padx=5)
 
+        ttk.Button(btn_frame, text="Export...", command=self.export_products).pack(side="right", padx=5)
+
+        ttk.Button(btn_frame, text="Import...", command=self.import_products).pack(side="right", padx=5)
+
 
         
         # Products table
@@ -318,8 +381,9 @@ class InventoryManagementSystem:
         
         columns = ("id", "name", "category", "price", "quantity", "status", "last_updated")
         self.tree = ttk.Treeview(table_frame, columns=columns, show="headings", 
-                                yscrollcommand=scrollbar.set)
-        scrollbar.config(command=self.tree.yview)
+                                yscrollcommand=self.on_products_scroll)
+        scrollbar.config(command=self.on_products_scrollbar)
+        self.products_scrollbar = scrollbar
         
         self.tree.heading("id", text="ID")
         self.tree.heading("name", text="Product Name")
@@ -360,61 +424,139 @@ class InventoryManagementSystem:
         # Bind double click to edit
         self.tree.bind("<Double-1>", lambda e: self.edit_selected_product())
 
-    def load_products(self):
-        with open("inventory.json", "r") as f:
-            inventory = json.load(f)
-        
-        self.tree.delete(*self.tree.get_children())
-        
-        for product in inventory:
-            status = "In Stock"
-            if product["quantity"] <= 0:
-                status = "Out of Stock"
-            elif product["quantity"] <= product["min_stock"]:
-                status = "Low Stock"
-            
-            self.tree.insert("", "end", values=(
-                product["id"],
-                product["name"],
-                product["category"],
-                f"${product['price']:,.2f}" if product['price'] >= 1 else f"${product['price']:.2f}",
-                product["quantity"],
-                status,
-                datetime.strptime(product["last_updated"], "%Y-%m-%d %H:%M:%S").strftime("%m/%d/%Y %H:%M")
-            ), tags=(status.lower().replace(" ", ""),))
+    def load_products(self, product_ids=None):
+        # Only the ids are fetched up front; the table holds a window of
+        # PRODUCT_WINDOW_ROWS rows, formatted as they come into view
+        self.product_row_ids = self.inventory.ids() if product_ids is None else list(product_ids)
+        self.fill_product_window(0)
+        self.tree.yview_moveto(0)
         
         # Configure tag colors
         self.tree.tag_configure("instock", background="#e8f5e9")
         self.tree.tag_configure("lowstock", background="#fff8e1")
         self.tree.tag_configure("outofstock", background="#ffebee")
 
-    def search_products(self):
-        query = self.search_entry.get().lower()
+    def fill_product_window(self, start):
+        if not self.tree.winfo_exists():
+            return
         
-        for item in self.tree.get_children():
-            values = [str(v).lower() for v in self.tree.item(item, "values")]
-            if any(query in v for v in values):
-                self.tree.selection_add(item)
-                self.tree.focus(item)
+        # Selected rows that are still in the window stay selected
+        selected = self.tree.selection()
+        self.product_window_start = start
+        self.tree.delete(*self.tree.get_children())
+        
+        window = self.product_row_ids[start:start + PRODUCT_WINDOW_ROWS]
+        for product in self.inventory.get_many(window):
+            values, status = self.format_product_row(product)
+            self.tree.insert("", "end", iid=str(product["id"]), values=values, 
+                             tags=(status.lower().replace(" ", ""),))
+        self.tree.selection_set([iid for iid in selected if self.tree.exists(iid)])
+
+    def show_product_row(self, index, recentre=False):
+        # Scroll so row `index` of product_row_ids is at the top. The
+        # window moves, centred on the view, when that page is not inside
+        # it or when asked to re-centre.
+        rows = len(self.tree.get_children())
+        first, last = self.tree.yview()
+        visible = max(1, round((last - first) * rows))
+        start = self.product_window_start
+        
+        if recentre or not (start <= index and index + visible <= start + rows):
+            start = index + visible // 2 - PRODUCT_WINDOW_ROWS // 2
+            start = max(0, min(start, len(self.product_row_ids) - PRODUCT_WINDOW_ROWS))
+            if start != self.product_window_start:
+                self.fill_product_window(start)
+                rows = len(self.tree.get_children())
+            elif recentre:
                 return
+        if rows:
+            self.tree.yview_moveto((index - start) / rows)
+
+    def format_product_row(self, product):
+        status = "In Stock"
+        if product["quantity"] <= 0:
+            status = "Out of Stock"
+        elif product["quantity"] <= product["min_stock"]:
+            status = "Low Stock"
+        
+        return (
+            product["id"],
+            product["name"],
+            product["category"],
+            f"${product['price']:,.2f}" if product['price'] >= 1 else f"${product['price']:.2f}",
+            product["quantity"],
+            status,
+            datetime.strptime(product["last_updated"], "%Y-%m-%d %H:%M:%S").strftime("%m/%d/%Y %H:%M")
+        ), status
+
+    def on_products_scroll(self, first, last):
+        # The tree reports its view of the window; the scrollbar shows it
+        # against the full id list
+        rows = len(self.tree.get_children())
+        total = len(self.product_row_ids)
+        start = self.product_window_start
+        first, last = float(first), float(last)
+        if not total:
+            self.products_scrollbar.set(0, 1)
+            return
+        self.products_scrollbar.set((start + first * rows) / total, (start + last * rows) / total)
+        
+        # Re-centre the window on the view before it runs out of rows
+        near_top = first < 0.25 and start > 0
+        near_bottom = last > 0.75 and start + rows < total
+        if near_top or near_bottom:
+            self.root.after_idle(self.recentre_product_window)
+
+    def recentre_product_window(self):
+        if not self.tree.winfo_exists():
+            return
+        rows = len(self.tree.get_children())
+        self.show_product_row(self.product_window_start + round(self.tree.yview()[0] * rows), recentre=True)
+
+    def on_products_scrollbar(self, action, *args):
+        # Dragging jumps straight to the matching row; arrows and page
+        # clicks scroll the tree, which re-centres the window as needed
+        if action == "moveto":
+            total = len(self.product_row_ids)
+            self.show_product_row(max(0, min(int(float(args[0]) * total), total - 1)))
+        else:
+            self.tree.yview(action, *args)
+
+    def search_products(self):
+        query = self.search_entry.get().strip()
+        if not query:
+            self.load_products()
+            return
         
-        messagebox.showinfo("Search", "No matching products found", parent=self.root)
+        # Narrow the table to every match, best match first
+        matches = self.inventory.search(query)
+        if not matches:
+            messagebox.showinfo("Search", "No matching products found", parent=self.root)
+            return
+        
+        self.load_products(matches)
+        self.filter_count_label.config(text=f"{len(matches)} matches")
+        first = str(matches[0])
+        self.tree.selection_set(first)
+        self.tree.focus(first)
+        self.tree.see(first)
 
     def clear_search(self):
         self.search_entry.delete(0, tk.END)
         self.category_var.set("")
         self.load_products()
+        self.filter_count_label.config(text=f"{self.inventory.count()} products")
 
     def filter_by_category(self):
         category = self.category_var.get()
         if not category:
             return
         
-        for item in self.tree.get_children():
-            if self.tree.item(item, "values")[2] == category:
-                self.tree.selection_add(item)
-            else:
-                self.tree.selection_remove(item)
+        # Rebuild the table from the category index
+        self.load_products(self.inventory.ids_in_category(category))
+        
+        count = self.inventory.category_counts().get(category, 0)
+        self.filter_count_label.config(text=f"{count} products in {category}")
 
     def add_product(self):
         self.clear_window()
@@ -472,52 +614,10 @@ class InventoryManagementSystem:
     def save_product(self):
         try:
             # Validate inputs
-            name = self.entries["name"].get().strip()
-            if not name:
-                raise ValueError("Product name is required")
-            
-            category = self.entries["category"].get().strip()
-            if not category:
-                raise ValueError("Category is required")
-            
-            price = float(self.entries["price"].get())
-            if price <= 0:
-                raise ValueError("Price must be positive")
-            
-            quantity = int(self.entries["quantity"].get())
-            if quantity < 0:
-                raise ValueError("Quantity cannot be negative")
-            
-            min_stock = int(self.entries["min_stock"].get())
-            if min_stock < 0:
-                raise ValueError("Minimum stock cannot be negative")
-            
-            description = self.entries["description"].get("1.0", tk.END).strip()
-            
-            # Get existing inventory
-            with open("inventory.json", "r") as f:
-                inventory = json.load(f)
-            
-            # Generate new ID
-            new_id = max((p["id"] for p in inventory), default=0) + 1
-            
-            # Add new product
-            new_product = {
-                "id": new_id,
-                "name": name,
-                "category": category,
-                "price": price,
-                "quantity": quantity,
-                "min_stock": min_stock,
-                "description": description,
-                "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
+            fields = validate_product_fields(self.form_fields())
             
-            inventory.append(new_product)
-            
-            # Save back to file
-            with open("inventory.json", "w") as f:
-                json.dump(inventory, f, indent=2)
+            # Add new product (the repository assigns the ID and saves)
+            new_product = self.inventory.add(fields)
             
             # Record transaction
             self.record_transaction("ADD", new_product)
@@ -537,10 +637,7 @@ class InventoryManagementSystem:
         item = self.tree.item(selected[0])
         product_id = item["values"][0]
         
-        with open("inventory.json", "r") as f:
-            inventory = json.load(f)
-        
-        product = next((p for p in inventory if p["id"] == product_id), None)
+        product = self.inventory.get(product_id)
         if not product:
             messagebox.showerror("Error", "Product not found", parent=self.root)
             return
@@ -593,8 +690,9 @@ class InventoryManagementSystem:
         self.entries["min_stock"].set(str(product["min_stock"]))
         self.entries["description"].insert("1.0", product.get("description", ""))
         
-        # Hidden ID field
+        # Hidden ID field, and the version the form was filled from
         self.editing_id = product["id"]
+        self.editing_version = product.get("version", 0)
         
         # Button frame
         btn_frame = ttk.Frame(form_frame)
@@ -608,62 +706,10 @@ class InventoryManagementSystem:
     def update_product(self):
         try:
             # Validate inputs
-            name = self.entries["name"].get().strip()
-            if not name:
-                raise ValueError("Product name is required")
-            
-            category = self.entries["category"].get().strip()
-            if not category:
-                raise ValueError("Category is required")
-            
-            price = float(self.entries["price"].get())
-            if price <= 0:
-                raise ValueError("Price must be positive")
-            
-            quantity = int(self.entries["quantity"].get())
-            if quantity < 0:
-                raise ValueError("Quantity cannot be negative")
-            
-            min_stock = int(self.entries["min_stock"].get())
-            if min_stock < 0:
-                raise ValueError("Minimum stock cannot be negative")
-            
-            description = self.entries["description"].get("1.0", tk.END).strip()
-            
-            # Get existing inventory
-            with open("inventory.json", "r") as f:
-                inventory = json.load(f)
-            
-            # Find and update product
-            updated = False
-            old_product = None
-            new_product = None
-            
-            for i, product in enumerate(inventory):
-                if product["id"] == self.editing_id:
-                    old_product = product.copy()
-                    
-                    inventory[i] = {
-                        "id": self.editing_id,
-                        "name": name,
-                        "category": category,
-                        "price": price,
-                        "quantity": quantity,
-                        "min_stock": min_stock,
-                        "description": description,
-                        "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    }
-                    
-                    new_product = inventory[i]
-                    updated = True
-                    break
+            fields = validate_product_fields(self.form_fields())
             
-            if not updated:
-                raise ValueError("Product not found")
-            
-            # Save back to file
-            with open("inventory.json", "w") as f:
-                json.dump(inventory, f, indent=2)
+            # Find and update product, unless someone else changed it first
+            old_product, new_product = self.inventory.update(self.editing_id, fields, self.editing_version)
             
             # Record transaction
             self.record_transaction("UPDATE", new_product, old_product)
@@ -671,9 +717,110 @@ class InventoryManagementSystem:
             messagebox.showinfo("Success", "Product updated successfully!", parent=self.root)
             self.view_products()
         
+        except ConflictError as e:
+            messagebox.showerror("Update Conflict", str(e), parent=self.root)
+            self.view_products()
+        
         except ValueError as e:
             messagebox.showerror("Input Error", str(e), parent=self.root)
 
+    def form_fields(self):
+        # Raw product form values, checked by validate_product_fields
+        fields = {key: self.entries[key].get() for key in ("name", "category", "price", "quantity", "min_stock")}
+        fields["description"] = self.entries["description"].get("1.0", tk.END)
+        return fields
+
+    def import_products(self):
+        path = filedialog.askopenfilename(
+            parent=self.root, title="Import Products",
+            filetypes=[("CSV files", "*.csv"), ("JSON lines", "*.jsonl *.ndjson"), ("All files", "*.*")])
+        if not path:
+            return
+        
+        def work(job, update):
+            def progress(done, total, imported, errors):
+                job.check()
+                update(done / max(total, 1), f"{imported} imported, {errors} rejected")
+            
+            return inventoryBulk.import_products(self.inventory, self.journal, path, self.current_user, 
+                                                 progress=progress)
+        
+        def done(result):
+            message = f"Imported {result['imported']} products."
+            errors = result["errors"]
+            if errors:
+                lines = [f"Line {line}: {error}" for line, error in errors[:10]]
+                if len(errors) > 10:
+                    lines.append(f"... and {len(errors) - 10} more")
+                message += f"\n\n{len(errors)} rows were rejected:\n" + "\n".join(lines)
+            messagebox.showinfo("Import Complete", message, parent=self.root)
+            self.view_products()
+        
+        self.run_bulk_task("Importing Products", work, done)
+
+    def export_products(self):
+        path = filedialog.asksaveasfilename(
+            parent=self.root, title="Export Products", defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("JSON lines", "*.jsonl")])
+        if not path:
+            return
+        
+        def work(job, update):
+            def progress(done, total):
+                job.check()
+                update(done / max(total, 1), f"{done} of {total} exported")
+            
+            return inventoryBulk.export_products(self.inventory, path, progress=progress)
+        
+        self.run_bulk_task("Exporting Products", work, lambda count: messagebox.showinfo(
+            "Export Complete", f"Exported {count} products to {os.path.basename(path)}.", parent=self.root))
+
+    def run_bulk_task(self, title, work, on_done):
+        # Runs an import/export on the report engine's workers behind a modal
+        # progress dialog. Cancelling stops at the next batch; batches an
+        # import has already committed are kept.
+        self.load_charting()
+        
+        dialog = tk.Toplevel(self.root)
+        dialog.title(title)
+        dialog.transient(self.root)
+        dialog.resizable(False, False)
+        
+        frame = ttk.Frame(dialog, padding=20)
+        frame.pack(fill="both", expand=True)
+        
+        status_var = tk.StringVar(value="Starting...")
+        progress_var = tk.DoubleVar(value=0)
+        ttk.Label(frame, textvariable=status_var).pack(anchor="w", pady=(0, 10))
+        ttk.Progressbar(frame, variable=progress_var, maximum=1.0, length=350).pack(pady=(0, 10))
+        
+        # Written by the worker, read by the Tk thread
+        state = {"fraction": 0, "status": "Starting..."}
+        
+        def update(fraction, status):
+            state["fraction"], state["status"] = fraction, status
+        
+        def refresh():
+            if dialog.winfo_exists():
+                progress_var.set(state["fraction"])
+                status_var.set(state["status"])
+                dialog.after(100, refresh)
+        
+        def finish(callback, *args, **kwargs):
+            dialog.grab_release()
+            dialog.destroy()
+            callback(*args, **kwargs)
+        
+        job = self.reports.submit(
+            lambda job: work(job, update),
+            lambda result: finish(on_done, result),
+            lambda error: finish(messagebox.showerror, title, str(error), parent=self.root))
+        
+        ttk.Button(frame, text="Cancel", command=lambda: finish(job.cancel)).pack()
+        dialog.protocol("WM_DELETE_WINDOW", lambda: finish(job.cancel))
+        dialog.grab_set()
+        refresh()
+
     def delete_selected_product(self):
         selected = self.tree.selection()
         if not selected:
@@ -683,32 +830,27 @@ class InventoryManagementSystem:
         item = self.tree.item(selected[0])
         product_id = item["values"][0]
         
+        product = self.inventory.get(product_id)
+        if not product:
+            messagebox.showerror("Error", "Product not found", parent=self.root)
+            return
+        
         if not messagebox.askyesno("Confirm Delete", 
                                   "Are you sure you want to delete this product?\nThis action cannot be undone.", 
                                   parent=self.root):
             return
         
-        with open("inventory.json", "r") as f:
-            inventory = json.load(f)
-        
-        # Find and remove product
-        deleted_product = None
-        new_inventory = []
-        
-        for product in inventory:
-            if product["id"] == product_id:
-                deleted_product = product
-            else:
-                new_inventory.append(product)
-        
-        if not deleted_product:
+        # Find and remove product, unless it changed while we were asking
+        try:
+            deleted_product = self.inventory.delete(product_id, product.get("version", 0))
+        except ConflictError as e:
+            messagebox.showerror("Delete Conflict", str(e), parent=self.root)
+            self.view_products()
+            return
+        except ValueError:
             messagebox.showerror("Error", "Product not found", parent=self.root)
             return
         
-        # Save back to file
-        with open("inventory.json", "w") as f:
-            json.dump(new_inventory, f, indent=2)
-        
         # Record transaction
         self.record_transaction("DELETE", deleted_product)
         
@@ -725,10 +867,7 @@ class InventoryManagementSystem:
         item = self.tree.item(selected[0])
         product_id = item["values"][0]
 
-        with open("inventory.json", "r") as f:
-            inventory = json.load(f)
-
-        product = next((p for p in inventory if p["id"] == product_id), None)
+        product = self.inventory.get(product_id)
         if not product:
             messagebox.showerror("Error", "Product not found", parent=self.root)
             return
@@ -782,28 +921,12 @@ class InventoryManagementSystem:
             if quantity < 0:
                 raise ValueError("Quantity cannot be negative")
 
-            # Get existing inventory
-            with open("inventory.json", "r") as f:
-                inventory = json.load(f)
-
             # Find and update product
-            updated = False
-            for i, product in enumerate(inventory):
-                if product["id"] == self.adding_stock_id:
-                    inventory[i]["quantity"] += quantity
-                    inventory[i]["last_updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    updated = True
-                    break
-
-            if not updated:
-                raise ValueError("Product not found")
-
-            # Save back to file
-            with open("inventory.json", "w") as f:
-                json.dump(inventory, f, indent=2)
+            product = self.inventory.adjust_stock(self.adding_stock_id, quantity)
 
             # Record transaction
-            self.record_transaction("STOCK_ADD", {"id": self.adding_stock_id, "quantity": quantity})
+            self.record_transaction("STOCK_ADD", {"id": self.adding_stock_id, "name": product["name"], 
+                                                  "quantity": quantity})
 
             messagebox.showinfo("Success", "Stock added successfully!", parent=self.root)
             self.view_products()
@@ -811,6 +934,122 @@ class InventoryManagementSystem:
         except ValueError as e:
             messagebox.showerror("Input Error", str(e), parent=self.root)
 
+    def stock_movements(self):
+        # Receive or pick many products, applied together in one write
+        self.clear_window()
+        self.setup_navigation("Batch Stock Movements")
+        
+        content_frame = ttk.Frame(self.root)
+        content_frame.pack(fill="both", expand=True, padx=10, pady=10)
+        
+        # Line entry
+        entry_frame = ttk.Frame(content_frame)
+        entry_frame.pack(fill="x", pady=(0, 10))
+        
+        ttk.Label(entry_frame, text="Product ID:").pack(side="left", padx=5)
+        id_entry = ttk.Entry(entry_frame, width=10)
+        id_entry.pack(side="left", padx=5)
+        
+        ttk.Label(entry_frame, text="Quantity:").pack(side="left", padx=(15, 5))
+        quantity_entry = ttk.Spinbox(entry_frame, from_=1, to=100000, increment=1, width=10)
+        quantity_entry.pack(side="left", padx=5)
+        quantity_entry.set(1)
+        
+        direction_var = tk.StringVar(value="receive")
+        ttk.Radiobutton(entry_frame, text="Receive", value="receive", 
+                        variable=direction_var).pack(side="left", padx=(15, 5))
+        ttk.Radiobutton(entry_frame, text="Pick", value="pick", variable=direction_var).pack(side="left", padx=5)
+        
+        # Lines table
+        table_frame = ttk.Frame(content_frame)
+        table_frame.pack(fill="both", expand=True)
+        
+        scrollbar = ttk.Scrollbar(table_frame)
+        scrollbar.pack(side="right", fill="y")
+        
+        columns = ("id", "name", "current", "change", "new")
+        tree = ttk.Treeview(table_frame, columns=columns, show="headings", yscrollcommand=scrollbar.set)
+        scrollbar.config(command=tree.yview)
+        
+        tree.heading("id", text="ID")
+        tree.heading("name", text="Product Name")
+        tree.heading("current", text="Current Stock")
+        tree.heading("change", text="Change")
+        tree.heading("new", text="After")
+        
+        tree.column("id", width=50, anchor="center")
+        tree.column("name", width=250)
+        tree.column("current", width=100, anchor="center")
+        tree.column("change", width=100, anchor="center")
+        tree.column("new", width=100, anchor="center")
+        
+        tree.pack(fill="both", expand=True)
+        
+        # (product_id, delta) in entry order, and each product's quantity
+        # after the lines so far
+        movements = []
+        projected = {}
+        
+        def add_line():
+            try:
+                product_id = int(id_entry.get())
+                quantity = int(quantity_entry.get())
+                if quantity <= 0:
+                    raise ValueError("Quantity must be positive")
+                
+                product = self.inventory.get(product_id)
+                if not product:
+                    raise ValueError("Product not found")
+                
+                delta = quantity if direction_var.get() == "receive" else -quantity
+                current = projected.get(product_id, product["quantity"])
+                if current + delta < 0:
+                    raise ValueError(f"Not enough stock to remove for {product['name']} (ID {product_id})")
+                
+                movements.append((product_id, delta))
+                projected[product_id] = current + delta
+                tree.insert("", "end", values=(product_id, product["name"], current, f"{delta:+d}", current + delta))
+                
+                id_entry.delete(0, tk.END)
+                id_entry.focus_set()
+            except ValueError as e:
+                messagebox.showerror("Input Error", str(e), parent=self.root)
+        
+        def clear_lines():
+            movements.clear()
+            projected.clear()
+            tree.delete(*tree.get_children())
+        
+        def apply():
+            if not movements:
+                messagebox.showwarning("No Movements", "Add at least one line first", parent=self.root)
+                return
+            try:
+                products = self.inventory.apply_stock_movements(movements)
+            except ValueError as e:
+                messagebox.showerror("Input Error", str(e), parent=self.root)
+                return
+            
+            self.record_stock_batch(movements, products)
+            messagebox.showinfo("Success", f"Applied {len(movements)} movements to {len(products)} products.", 
+                                parent=self.root)
+            self.view_products()
+        
+        ttk.Button(entry_frame, text="Add Line", style="Secondary.TButton", 
+                   command=add_line).pack(side="left", padx=(15, 5))
+        id_entry.bind("<Return>", lambda e: add_line())
+        quantity_entry.bind("<Return>", lambda e: add_line())
+        id_entry.focus_set()
+        
+        # Action buttons
+        btn_frame = ttk.Frame(content_frame)
+        btn_frame.pack(fill="x", pady=(10, 0))
+        
+        ttk.Button(btn_frame, text="Apply Movements", style="Primary.TButton", 
+                   command=apply).pack(side="left", padx=5)
+        ttk.Button(btn_frame, text="Clear Lines", command=clear_lines).pack(side="left", padx=5)
+        ttk.Button(btn_frame, text="Cancel", command=self.view_products).pack(side="right", padx=5)
+
     def remove_stock(self):
         selected = self.tree.selection()
         if not selected:
@@ -820,10 +1059,7 @@ class InventoryManagementSystem:
         item = self.tree.item(selected[0])
         product_id = item["values"][0]
 
-        with open("inventory.json", "r") as f:
-            inventory = json.load(f)
-
-        product = next((p for p in inventory if p["id"] == product_id), None)
+        product = self.inventory.get(product_id)
         if not product:
             messagebox.showerror("Error", "Product not found", parent=self.root)
             return
@@ -877,30 +1113,12 @@ class InventoryManagementSystem:
             if quantity < 0:
                 raise ValueError("Quantity cannot be negative")
 
-            # Get existing inventory
-            with open("inventory.json", "r") as f:
-                inventory = json.load(f)
-
             # Find and update product
-            updated = False
-            for i, product in enumerate(inventory):
-                if product["id"] == self.removing_stock_id:
-                    if product["quantity"] < quantity:
-                        raise ValueError("Not enough stock to remove")
-                    inventory[i]["quantity"] -= quantity
-                    inventory[i]["last_updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    updated = True
-                    break
-
-            if not updated:
-                raise ValueError("Product not found")
-
-            # Save back to file
-            with open("inventory.json", "w") as f:
-                json.dump(inventory, f, indent=2)
+            product = self.inventory.adjust_stock(self.removing_stock_id, -quantity)
 
             # Record transaction
-            self.record_transaction("STOCK_REMOVE", {"id": self.removing_stock_id, "quantity": quantity})
+            self.record_transaction("STOCK_REMOVE", {"id": self.removing_stock_id, "name": product["name"], 
+                                                     "quantity": quantity})
 
             messagebox.showinfo("Success", "Stock removed successfully!", parent=self.root)
             self.view_products()
@@ -944,6 +1162,7 @@ class InventoryManagementSystem:
                       command=command).pack(fill="x", pady=(10, 0))
 
     def inventory_summary_report(self):
+        self.load_charting()
         self.clear_window()
         self.setup_navigation("Inventory Summary")
         
@@ -951,67 +1170,60 @@ class InventoryManagementSystem:
         content_frame = ttk.Frame(self.root)
         content_frame.pack(fill="both", expand=True, padx=10, pady=10)
         
-        # Load inventory data
-        with open("inventory.json", "r") as f:
-            inventory = json.load(f)
-        
-        # Calculate summary
-        total_value = sum(p["price"]*p["quantity"] for p in inventory)
-        low_stock = sum(1 for p in inventory if p["quantity"] <= p["min_stock"])
-        out_of_stock = sum(1 for p in inventory if p["quantity"] <= 0)
-        
         # Chart frame
         chart_frame = ttk.Frame(content_frame)
         chart_frame.pack(fill="both", expand=True, pady=(0, 20))
         
-        fig = plt.figure(figsize=(10, 6), dpi=80)
-        ax = fig.add_subplot(111)
-        
-        categories = {}
-        for product in inventory:
-            if product['category'] not in categories:
-                categories[product['category']] = 0
-            categories[product['category']] += product['price'] * product['quantity']
-        
-        labels = list(categories.keys())
-        values = list(categories.values())
-        
-        # Create pie chart
-        wedges, texts, autotexts = ax.pie(
-            values, labels=labels, autopct='%1.1f%%',
-            shadow=True, startangle=90, 
-            colors=plt.cm.Pastel1(np.linspace(0, 1, len(labels))),
-            textprops={'fontsize': 10}
-        )
-        
-        ax.set_title('Inventory Value by Category', fontsize=14, fontweight='bold')
-        ax.axis('equal')
-        
-        chart = FigureCanvasTkAgg(fig, chart_frame)
-        chart.draw()
-        chart.get_tk_widget().pack(fill="both", expand=True)
-        
-        # Summary frame
-        summary_frame = ttk.Frame(content_frame)
-        summary_frame.pack(fill="x", pady=(10, 0))
-        
-        stats_data = [
-            {"title": "Total Products", "value": len(inventory), "color": "#4e79a7"},
-            {"title": "Inventory Value", "value": f"${total_value:,.2f}", "color": "#f28e2b"},
-            {"title": "Low Stock Items", "value": low_stock, "color": "#e15759"},
-            {"title": "Out of Stock Items", "value": out_of_stock, "color": "#76b7b2"}
-        ]
-        
-        for i, stat in enumerate(stats_data):
-            card = ttk.Frame(summary_frame, relief="groove", borderwidth=2, padding=10)
-            card.grid(row=0, column=i, padx=5, sticky="nsew")
-            summary_frame.columnconfigure(i, weight=1)
+        def work(job):
+            # Calculate summary
+            summary = {
+                "total_products": self.inventory.count(),
+                "total_value": self.inventory.total_value(),
+                "low_stock": self.inventory.low_stock_count(),
+                "out_of_stock": self.inventory.out_of_stock_count()
+            }
+            categories = self.inventory.category_summary()
+            job.check()
             
-            ttk.Label(card, text=stat["title"], font=('Helvetica', 10, 'bold'), 
-                     foreground=stat["color"]).pack(anchor="w")
-            ttk.Label(card, text=str(stat["value"]), font=('Helvetica', 16, 'bold')).pack()
-
-    def low_stock_report(self):
+            labels = list(categories.keys())
+            values = [c["total_value"] for c in categories.values()]
+            
+            # Create pie chart
+            with self.charts.lock("inventory_summary"):
+                self.charts.pie("inventory_summary", labels, values, 'Inventory Value by Category', 
+                                colormap="Pastel1", textprops={'fontsize': 10}, 
+                                title_style={'fontsize': 14, 'fontweight': 'bold'})
+                job.check()
+                summary["chart"] = self.charts.render_png("inventory_summary")
+            return summary
+        
+        def show(summary):
+            self.charts.show_png("inventory_summary", chart_frame, summary["chart"])
+            
+            # Summary frame
+            summary_frame = ttk.Frame(content_frame)
+            summary_frame.pack(fill="x", pady=(10, 0))
+            
+            stats_data = [
+                {"title": "Total Products", "value": summary["total_products"], "color": "#4e79a7"},
+                {"title": "Inventory Value", "value": f"${summary['total_value']:,.2f}", "color": "#f28e2b"},
+                {"title": "Low Stock Items", "value": summary["low_stock"], "color": "#e15759"},
+                {"title": "Out of Stock Items", "value": summary["out_of_stock"], "color": "#76b7b2"}
+            ]
+            
+            for i, stat in enumerate(stats_data):
+                card = ttk.Frame(summary_frame, relief="groove", borderwidth=2, padding=10)
+                card.grid(row=0, column=i, padx=5, sticky="nsew")
+                summary_frame.columnconfigure(i, weight=1)
+                
+                ttk.Label(card, text=stat["title"], font=('Helvetica', 10, 'bold'), 
+                         foreground=stat["color"]).pack(anchor="w")
+                ttk.Label(card, text=str(stat["value"]), font=('Helvetica', 16, 'bold')).pack()
+        
+        self.run_report(chart_frame, work, show)
+
+    def low_stock_report(self, page=0):
+        self.load_charting()
         self.clear_window()
         self.setup_navigation("Low Stock Report")
         
@@ -1019,86 +1231,106 @@ class InventoryManagementSystem:
         content_frame = ttk.Frame(self.root)
         content_frame.pack(fill="both", expand=True, padx=10, pady=10)
         
-        # Load inventory data
-        with open("inventory.json", "r") as f:
-            inventory = json.load(f)
-        
-        low_stock_items = [p for p in inventory if p["quantity"] <= p["min_stock"]]
-        
-        if not low_stock_items:
-            ttk.Label(content_frame, text="No low stock items found!", font=('Helvetica', 14)).pack(pady=50)
-            return
-        
         # Chart frame
         chart_frame = ttk.Frame(content_frame)
         chart_frame.pack(fill="both", expand=True, pady=(0, 20))
         
-        fig = plt.figure(figsize=(10, 6), dpi=80)
-        ax = fig.add_subplot(111)
-        
-        # Sort by percentage of stock remaining
-        low_stock_items.sort(key=lambda x: (x["quantity"] / x["min_stock"]) if x["min_stock"] > 0 else 0)
-        
-        product_names = [p["name"] for p in low_stock_items]
-        quantities = [p["quantity"] for p in low_stock_items]
-        min_stocks = [p["min_stock"] for p in low_stock_items]
-        
-        x = range(len(product_names))
-        width = 0.35
-        
-        bars1 = ax.bar(x, quantities, width, label='Current Stock', color='#f28e2b')
-        bars2 = ax.bar([i + width for i in x], min_stocks, width, label='Minimum Stock', color='#e15759')
-        
-        ax.set_xlabel('Products', fontsize=12)
-        ax.set_ylabel('Quantity', fontsize=12)
-        ax.set_title('Low Stock Items Report', fontsize=14, fontweight='bold')
-        ax.set_xticks([i + width / 2 for i in x])
-        ax.set_xticklabels(product_names, rotation=45, ha='right', fontsize=10)
-        ax.legend(fontsize=10)
-        
-        fig.tight_layout()
-        chart = FigureCanvasTkAgg(fig, chart_frame)
-        chart.draw()
-        chart.get_tk_widget().pack(fill="both", expand=True)
-        
-        # Table frame
-        table_frame = ttk.Frame(content_frame)
-        table_frame.pack(fill="both", expand=True, pady=(20, 0))
-        
-        scrollbar = ttk.Scrollbar(table_frame)
-        scrollbar.pack(side="right", fill="y")
-        
-        columns = ("name", "category", "quantity", "min_stock", "needed")
-        tree = ttk.Treeview(table_frame, columns=columns, show="headings", 
-                           yscrollcommand=scrollbar.set)
-        scrollbar.config(command=tree.yview)
-        
-        tree.heading("name", text="Product Name")
-        tree.heading("category", text="Category")
-        tree.heading("quantity", text="Current Stock")
-        tree.heading("min_stock", text="Minimum Stock")
-        tree.heading("needed", text="To Order")
-        
-        tree.column("name", width=200)
-        tree.column("category", width=150)
-        tree.column("quantity", width=100, anchor="center")
-        tree.column("min_stock", width=100, anchor="center")
-        tree.column("needed", width=100, anchor="center")
-        
-        tree.pack(fill="both", expand=True)
-        
-        for product in low_stock_items:
-            needed = max(product["min_stock"] - product["quantity"], 0)
+        def work(job):
+            # Most critical items first, one page at a time
+            total_items = self.inventory.low_stock_count()
+            page_count = max((total_items + LOW_STOCK_PAGE_SIZE - 1) // LOW_STOCK_PAGE_SIZE, 1)
+            current_page = min(max(page, 0), page_count - 1)
+            items = self.inventory.low_stock_items(LOW_STOCK_PAGE_SIZE, current_page * LOW_STOCK_PAGE_SIZE)
+            report = {"total_items": total_items, "page_count": page_count, "page": current_page, 
+                      "items": items}
+            if not items:
+                return report
+            job.check()
             
-            tree.insert("", "end", values=(
-                product["name"],
-                product["category"],
-                product["quantity"],
-                product["min_stock"],
-                needed if needed > 0 else "✔"
-            ))
+            product_names = [p["name"] for p in items]
+            quantities = [p["quantity"] for p in items]
+            min_stocks = [p["min_stock"] for p in items]
+            
+            with self.charts.lock("low_stock"):
+                self.charts.grouped_bars("low_stock", product_names, [
+                    ('Current Stock', quantities, '#f28e2b'),
+                    ('Minimum Stock', min_stocks, '#e15759')
+                ], 'Low Stock Items Report', 'Products', 'Quantity')
+                job.check()
+                report["chart"] = self.charts.render_png("low_stock")
+            return report
+        
+        def show(report):
+            low_stock_items = report["items"]
+            if not low_stock_items:
+                chart_frame.destroy()
+                ttk.Label(content_frame, text="No low stock items found!", font=('Helvetica', 14)).pack(pady=50)
+                return
+            
+            page, page_count = report["page"], report["page_count"]
+            
+            # Paging controls
+            page_frame = ttk.Frame(content_frame)
+            page_frame.pack(fill="x", pady=(0, 10), before=chart_frame)
+            
+            prev_button = ttk.Button(page_frame, text="< Previous", 
+                                     command=lambda: self.low_stock_report(page - 1))
+            prev_button.pack(side="left", padx=5)
+            if page == 0:
+                prev_button.state(["disabled"])
+            
+            ttk.Label(page_frame, text=f"Page {page + 1} of {page_count} ({report['total_items']} items)").pack(
+                side="left", padx=10)
+            
+            next_button = ttk.Button(page_frame, text="Next >", 
+                                     command=lambda: self.low_stock_report(page + 1))
+            next_button.pack(side="left", padx=5)
+            if page >= page_count - 1:
+                next_button.state(["disabled"])
+            
+            self.charts.show_png("low_stock", chart_frame, report["chart"])
+            
+            # Table frame
+            table_frame = ttk.Frame(content_frame)
+            table_frame.pack(fill="both", expand=True, pady=(20, 0))
+            
+            scrollbar = ttk.Scrollbar(table_frame)
+            scrollbar.pack(side="right", fill="y")
+            
+            columns = ("name", "category", "quantity", "min_stock", "needed")
+            tree = ttk.Treeview(table_frame, columns=columns, show="headings", 
+                               yscrollcommand=scrollbar.set)
+            scrollbar.config(command=tree.yview)
+            
+            tree.heading("name", text="Product Name")
+            tree.heading("category", text="Category")
+            tree.heading("quantity", text="Current Stock")
+            tree.heading("min_stock", text="Minimum Stock")
+            tree.heading("needed", text="To Order")
+            
+            tree.column("name", width=200)
+            tree.column("category", width=150)
+            tree.column("quantity", width=100, anchor="center")
+            tree.column("min_stock", width=100, anchor="center")
+            tree.column("needed", width=100, anchor="center")
+            
+            tree.pack(fill="both", expand=True)
+            
+            for product in low_stock_items:
+                needed = max(product["min_stock"] - product["quantity"], 0)
+                
+                tree.insert("", "end", values=(
+                    product["name"],
+                    product["category"],
+                    product["quantity"],
+                    product["min_stock"],
+                    needed if needed > 0 else "✔"
+                ))
+        
+        self.run_report(chart_frame, work, show)
 
     def category_analysis_report(self):
+        self.load_charting()
         self.clear_window()
         self.setup_navigation("Category Analysis")
         
@@ -1106,64 +1338,32 @@ class InventoryManagementSystem:
         content_frame = ttk.Frame(self.root)
         content_frame.pack(fill="both", expand=True, padx=10, pady=10)
         
-        # Load inventory data
-        with open("inventory.json", "r") as f:
-            inventory = json.load(f)
-        
         # Chart frame
         chart_frame = ttk.Frame(content_frame)
         chart_frame.pack(fill="both", expand=True, pady=(0, 20))
         
-        fig = plt.figure(figsize=(10, 6), dpi=80)
-        ax = fig.add_subplot(111)
-        
-        # Group data by category
-        categories = {}
-        for product in inventory:
-            if product["category"] not in categories:
-                categories[product["category"]] = {
-                    "count": 0,
-                    "total_value": 0,
-                    "items": []
-                }
-            categories[product["category"]]["count"] += 1
-            categories[product["category"]]["total_value"] += product["price"] * product["quantity"]
-            categories[product["category"]]["items"].append(product)
-        
-        # Sort categories by count
-        sorted_categories = sorted(categories.items(), key=lambda x: x[1]["count"], reverse=True)
-        category_names = [c[0] for c in sorted_categories]
-        counts = [c[1]["count"] for c in sorted_categories]
-        values = [c[1]["total_value"] for c in sorted_categories]
-        
-        # Create dual-axis chart
-        ax1 = ax
-        ax1.bar(category_names, counts, color='#4e79a7', alpha=0.7, label='Product Count')
-        ax1.set_xlabel('Categories', fontsize=12)
-        ax1.set_ylabel('Number of Products', color='#4e79a7', fontsize=12)
-        ax1.tick_params(axis='y', labelcolor='#4e79a7')
-        
-        ax2 = ax1.twinx()
-        ax2.plot(category_names, values, color='#e15759', marker='o', label='Total Value ($)')
-        ax2.set_ylabel('Total Inventory Value ($)', color='#e15759', fontsize=12)
-        ax2.tick_params(axis='y', labelcolor='#e15759')
-        
-        ax.set_title('Category Analysis: Product Count vs. Inventory Value', 
-                    fontsize=14, fontweight='bold')
-        
-        # Combine legends from both axes
-        lines, labels = ax1.get_legend_handles_labels()
-        lines2, labels2 = ax2.get_legend_handles_labels()
-        ax2.legend(lines + lines2, labels + labels2, loc='upper right')
-        
-        plt.xticks(rotation=45, ha='right')
-        fig.tight_layout()
-        
-        chart = FigureCanvasTkAgg(fig, chart_frame)
-        chart.draw()
-        chart.get_tk_widget().pack(fill="both", expand=True)
-
-    def value_distribution_report(self):
+        def work(job):
+            # Group data by category, sorted by count
+            table = self.report_table("category")
+            job.check()
+            category_names = [row[0] for row in table["rows"]]
+            counts = [row[1] for row in table["rows"]]
+            values = [row[2] for row in table["rows"]]
+            
+            # Create dual-axis chart
+            with self.charts.lock("category_analysis"):
+                self.charts.bar_line("category_analysis", category_names, counts, values, 
+                                     'Category Analysis: Product Count vs. Inventory Value', 'Categories', 
+                                     'Number of Products', 'Total Inventory Value ($)', 
+                                     bar_legend='Product Count', line_legend='Total Value ($)')
+                job.check()
+                return self.charts.render_png("category_analysis")
+        
+        self.run_report(chart_frame, work, 
+                        lambda png: self.charts.show_png("category_analysis", chart_frame, png))
+
+    def value_distribution_report(self, mode="top"):
+        self.load_charting()
         self.clear_window()
         self.setup_navigation("Value Distribution")
         
@@ -1171,72 +1371,124 @@ class InventoryManagementSystem:
         content_frame = ttk.Frame(self.root)
         content_frame.pack(fill="both", expand=True, padx=10, pady=10)
         
-        # Load inventory data
-        with open("inventory.json", "r") as f:
-            inventory = json.load(f)
+        # View selector
+        mode_frame = ttk.Frame(content_frame)
+        mode_frame.pack(fill="x", pady=(0, 10))
+        
+        mode_var = tk.StringVar(value=mode)
+        ttk.Label(mode_frame, text="View:").pack(side="left", padx=(0, 5))
+        ttk.Radiobutton(mode_frame, text=f"Top {VALUE_TOP_N} products", value="top", variable=mode_var,
+                        command=lambda: self.value_distribution_report("top")).pack(side="left", padx=5)
+        ttk.Radiobutton(mode_frame, text="Value histogram", value="histogram", variable=mode_var,
+                        command=lambda: self.value_distribution_report("histogram")).pack(side="left", padx=5)
         
         # Chart frame
         chart_frame = ttk.Frame(content_frame)
         chart_frame.pack(fill="both", expand=True, pady=(0, 20))
         
-        fig = plt.figure(figsize=(10, 6), dpi=80)
-        ax = fig.add_subplot(111)
-        
-        # Prepare data
-        values = [p["price"] * p["quantity"] for p in inventory]
-        names = [p["name"] for p in inventory]
-        
-        # Sort by value
-        sorted_values = sorted(zip(values, names), reverse=True)
-        values = [v[0] for v in sorted_values]
-        names = [v[1] for v in sorted_values]
-        
-        # Create waterfall chart
-        pos = range(len(values))
-        ax.bar(pos, values, color='#76b7b2', edgecolor='black')
-        
-        ax.set_xlabel('Products', fontsize=12)
-        ax.set_ylabel('Inventory Value ($)', fontsize=12)
-        ax.set_title('Product Value Distribution', fontsize=14, fontweight='bold')
-        
-        ax.set_xticks(pos)
-        ax.set_xticklabels(names, rotation=45, ha='right', fontsize=8)
-        
-        # Add value labels
-        for i, v in enumerate(values):
-            if v > 0:
-                ax.text(i, v, f"${v:,.0f}", ha='center', va='bottom', fontsize=8)
-        
-        fig.tight_layout()
-        chart = FigureCanvasTkAgg(fig, chart_frame)
-        chart.draw()
-        chart.get_tk_widget().pack(fill="both", expand=True)
-        
-        # Summary frame
-        summary_frame = ttk.Frame(content_frame)
-        summary_frame.pack(fill="x", pady=(10, 0))
-        
-        stats_data = [
-            {"title": "Total Inventory Value", "value": f"${sum(values):,.2f}", "color": "#76b7b2"},
-            {"title": "Most Valuable Item", 
-             "value": f"{names[0]} (${values[0]:,.2f})", 
-             "color": "#4e79a7"},
-            {"title": "Number of Products", "value": len(values), "color": "#f28e2b"}
-        ]
-        
-        for i, stat in enumerate(stats_data):
-            card = ttk.Frame(summary_frame, relief="groove", borderwidth=2, padding=10)
-            card.grid(row=0, column=i, padx=5, sticky="nsew")
-            summary_frame.columnconfigure(i, weight=1)
+        def work(job):
+            table = self.report_table("value", value_mode=mode)
+            job.check()
+            stats, rows = table["stats"], table["rows"]
+            top = stats["most_valuable"]
+            report = {
+                "total_value": stats["total_value"],
+                "top": (top["name"], top["value"]) if top else None,
+                "count": stats["count"],
+                "unvalued": stats.get("unvalued")
+            }
             
-            ttk.Label(card, text=stat["title"], font=('Helvetica', 10, 'bold'), 
-                     foreground=stat["color"]).pack(anchor="w")
-            ttk.Label(card, text=str(stat["value"]), font=('Helvetica', 12)).pack()
+            # Either way the chart has a bounded number of bars
+            key = "value_" + mode
+            with self.charts.lock(key):
+                if mode == "histogram":
+                    # Rows are (low, high, count) bins
+                    edges = [row[0] for row in rows] + [rows[-1][1]] if rows else []
+                    counts = [row[2] for row in rows]
+                    self.charts.histogram(key, edges, counts, 'Product Value Distribution', 
+                                          'Inventory Value per Product ($, log scale)', 'Number of Products')
+                else:
+                    names = [row[0] for row in rows]
+                    values = [row[1] for row in rows]
+                    self.charts.labelled_bars(key, names, values, 'Product Value Distribution', 
+                                              'Products', 'Inventory Value ($)')
+                job.check()
+                report["chart"] = self.charts.render_png(key)
+            return report
+        
+        def show(report):
+            self.charts.show_png("value_" + mode, chart_frame, report["chart"])
+            
+            # Summary frame
+            summary_frame = ttk.Frame(content_frame)
+            summary_frame.pack(fill="x", pady=(10, 0))
+            
+            top = report["top"]
+            stats_data = [
+                {"title": "Total Inventory Value", "value": f"${report['total_value']:,.2f}", "color": "#76b7b2"},
+                {"title": "Most Valuable Item", 
+                 "value": f"{top[0]} (${top[1]:,.2f})" if top else "-", 
+                 "color": "#4e79a7"},
+                {"title": "Number of Products", "value": report["count"], "color": "#f28e2b"}
+            ]
+            if report.get("unvalued"):
+                stats_data.append({"title": "Products With No Value", "value": report["unvalued"], 
+                                   "color": "#e15759"})
+            
+            for i, stat in enumerate(stats_data):
+                card = ttk.Frame(summary_frame, relief="groove", borderwidth=2, padding=10)
+                card.grid(row=0, column=i, padx=5, sticky="nsew")
+                summary_frame.columnconfigure(i, weight=1)
+                
+                ttk.Label(card, text=stat["title"], font=('Helvetica', 10, 'bold'), 
+                         foreground=stat["color"]).pack(anchor="w")
+                ttk.Label(card, text=str(stat["value"]), font=('Helvetica', 12)).pack()
+        
+        self.run_report(chart_frame, work, show)
+
+    def report_table(self, name, value_mode="top"):
+        # Report tables come from the inventory service when there is one,
+        # so the catalogue never crosses the socket; otherwise they are
+        # computed from the local snapshot
+        options = {"value_mode": value_mode, "top": VALUE_TOP_N, "bins": VALUE_HISTOGRAM_BINS}
+        if hasattr(self.inventory, "report"):
+            return self.inventory.report(name, options)
+        return inventoryReports.REPORT_BUILDERS[name](self.snapshots.get(), options)
+
+    def run_report(self, chart_frame, work, on_done):
+        # Show a progress indicator while the report engine computes and
+        # renders off the Tk thread; navigating away cancels the job
+        progress_frame = ttk.Frame(chart_frame)
+        progress_frame.pack(expand=True)
+        
+        ttk.Label(progress_frame, text="Preparing report...", font=('Helvetica', 12)).pack(pady=(0, 10))
+        progress = ttk.Progressbar(progress_frame, mode="indeterminate", length=300)
+        progress.pack()
+        progress.start(10)
+        
+        def done(result):
+            progress_frame.destroy()
+            on_done(result)
+        
+        def failed(error):
+            progress_frame.destroy()
+            messagebox.showerror("Report Error", str(error), parent=self.root)
+        
+        self.reports.submit(work, done, failed)
+
+    def fetch(self, *calls):
+        # Several (method, *params) reads in one round trip to the inventory
+        # service; plain local calls otherwise. "journal." names go to the journal.
+        if hasattr(self.inventory, "call_many"):
+            return self.inventory.call_many(calls)
+        
+        results = []
+        for method, *params in calls:
+            target, _, name = method.rpartition(".")
+            results.append(getattr(self.journal if target == "journal" else self.inventory, name)(*params))
+        return results
 
     def record_transaction(self, action, product, old_product=None):
-        with open("transactions.json", "r") as f:
-            transactions = json.load(f)
-        
         transaction = {
             "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "user": self.current_user,
@@ -1249,10 +1501,22 @@ class InventoryManagementSystem:
             }
         }
         
-        transactions.append(transaction)
-        
-        with open("transactions.json", "w") as f:
-            json.dump(transactions, f, indent=2)
+        self.journal.append(transaction)
+
+    def record_stock_batch(self, movements, products):
+        # One journal entry for a whole batch of stock movements
+        names = {product["id"]: product["name"] for product in products}
+        self.journal.append({
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "user": self.current_user,
+            "action": "STOCK_BATCH",
+            "product_id": None,
+            "product_name": f"{len(products)} products",
+            "details": {
+                "movements": [{"id": product_id, "name": names[product_id], "quantity": delta} 
+                              for product_id, delta in movements]
+            }
+        })
 
     def logout(self):
         self.current_user = None
@@ -1270,12 +1534,31 @@ class InventoryManagementSystem:
         ttk.Button(header_frame, text="Back to Main Menu", style="Primary.TButton", 
                   command=self.main_dashboard).pack(side="right")
 
+    def load_charting(self):
+        load_charting()
+        if self.charts is None:
+            self.charts = inventoryCharts.ChartManager()
+            self.reports = inventoryReports.ReportEngine(self.root)
+            self.snapshots = inventoryReports.SnapshotCache(self.inventory)
+
     def clear_window(self):
+        # Cancel reports still being prepared for the screen we are leaving,
+        # and detach report canvases before their frames go away
+        if self.reports is not None:
+            self.reports.cancel_all()
+        if self.charts is not None:
+            self.charts.release_all()
+        
         for widget in self.root.winfo_children():
             widget.destroy()
 
 if __name__ == "__main__":
     root = tk.Tk()
     app = InventoryManagementSystem(root)
+    mark_startup("login screen built")
+    root.after_idle(lambda: mark_startup("login screen shown"))
     root.mainloop()
+    if app.reports is not None:
+        app.reports.shutdown()
+    app.journal.close()
 
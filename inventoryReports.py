@@ -0,0 +1,397 @@
+import argparse
+import csv
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from storageUtils import atomic_write_json
+
+
+class ReportCancelled(Exception):
+    pass
+
+
+class ReportJob:
+    def __init__(self, on_done, on_error=None):
+        self.on_done = on_done
+        self.on_error = on_error
+        self.cancelled = threading.Event()
+        self.future = None
+
+    def check(self):
+        # Called by report work between stages so a cancelled job stops early
+        if self.cancelled.is_set():
+            raise ReportCancelled()
+
+    def cancel(self):
+        self.cancelled.set()
+        if self.future is not None:
+            self.future.cancel()
+
+
+class ReportEngine:
+    # Runs report loading, aggregation and off-screen rendering in a worker
+    # pool. Results are queued by the workers and handed to the Tk thread by
+    # a root.after poll, since Tk must only be touched from the main thread.
+    def __init__(self, root, max_workers=2, poll_interval=50):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report")
+        self.poll_interval = poll_interval
+        self.results = queue.Queue()
+        self.jobs = set()
+        self.polling = False
+
+    def submit(self, work, on_done, on_error=None):
+        job = ReportJob(on_done, on_error)
+        self.jobs.add(job)
+        job.future = self.executor.submit(work, job)
+        job.future.add_done_callback(lambda future: self.results.put(job))
+
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.poll_interval, self.poll)
+        return job
+
+    def poll(self):
+        while True:
+            try:
+                job = self.results.get_nowait()
+            except queue.Empty:
+                break
+
+            self.jobs.discard(job)
+            if job.cancelled.is_set() or job.future.cancelled():
+                continue
+
+            error = job.future.exception()
+            if error is None:
+                job.on_done(job.future.result())
+            elif not isinstance(error, ReportCancelled) and job.on_error is not None:
+                job.on_error(error)
+
+        if self.jobs:
+            self.root.after(self.poll_interval, self.poll)
+        else:
+            self.polling = False
+
+    def cancel_all(self):
+        for job in list(self.jobs):
+            job.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class InventorySnapshot:
+    # Columnar copy of the inventory for report analytics: one numpy array
+    # per numeric field and an integer code per product for its category
+    def __init__(self, products):
+        products = list(products)
+        count = len(products)
+        codes = {}
+
+        self.ids = np.fromiter((p["id"] for p in products), dtype=np.int64, count=count)
+        self.names = [p["name"] for p in products]
+        self.price = np.fromiter((p["price"] for p in products), dtype=np.float64, count=count)
+        self.quantity = np.fromiter((p["quantity"] for p in products), dtype=np.int64, count=count)
+        self.min_stock = np.fromiter((p["min_stock"] for p in products), dtype=np.int64, count=count)
+        self.category_codes = np.fromiter((codes.setdefault(p["category"], len(codes)) for p in products),
+                                          dtype=np.intp, count=count)
+        self.categories = list(codes)
+        self.value = self.price * self.quantity
+
+    def __len__(self):
+        return len(self.ids)
+
+    def total_value(self):
+        return float(self.value.sum())
+
+    def low_stock_mask(self):
+        return self.quantity <= self.min_stock
+
+    def out_of_stock_mask(self):
+        return self.quantity <= 0
+
+    def category_totals(self):
+        # (names, product counts, total values), most products first
+        size = len(self.categories)
+        counts = np.bincount(self.category_codes, minlength=size)
+        totals = np.bincount(self.category_codes, weights=self.value, minlength=size)
+        order = np.argsort(-counts, kind="stable")
+        return [self.categories[i] for i in order], counts[order], totals[order]
+
+    def by_value(self):
+        # (names, values), most valuable first
+        order = np.argsort(-self.value, kind="stable")
+        return [self.names[i] for i in order], self.value[order]
+
+    def most_valuable(self):
+        if not len(self):
+            return None
+        i = int(np.argmax(self.value))
+        return self.names[i], float(self.value[i])
+
+    def top_values(self, count):
+        # The `count` most valuable products, most valuable first, with the
+        # rest summed into one "Other" bucket. argpartition keeps this linear
+        # in the catalogue size; only the selected products are sorted.
+        if len(self) <= count:
+            return self.by_value()
+
+        top = np.argpartition(-self.value, count - 1)[:count]
+        top = top[np.argsort(-self.value[top], kind="stable")]
+        names = [self.names[i] for i in top]
+        values = self.value[top]
+
+        rest = len(self) - count
+        names.append(f"Other ({rest} products)")
+        return names, np.append(values, self.value.sum() - values.sum())
+
+    def low_stock_order(self):
+        # Indices of products at or below minimum stock, most critical first
+        # (same order as inventoryStore.low_stock_key)
+        ratio = np.divide(self.quantity, self.min_stock, out=np.zeros(len(self)), where=self.min_stock > 0)
+        low = np.flatnonzero(self.low_stock_mask())
+        return low[np.lexsort((self.ids[low], ratio[low]))]
+
+    def value_histogram(self, bins):
+        # Product counts over log-spaced value bins: (edges, counts, products
+        # with no stock value, which a log scale cannot place)
+        positive = self.value[self.value > 0]
+        if not len(positive):
+            return np.array([]), np.array([], dtype=np.int64), len(self)
+
+        low, high = np.log10(positive.min()), np.log10(positive.max())
+        if high - low < 1e-9:
+            edges = np.logspace(low - 0.5, high + 0.5, bins + 1)
+        else:
+            # logspace round-off can put the outer edges just inside the
+            # data, which would drop the cheapest or dearest product
+            edges = np.logspace(low, high, bins + 1)
+            edges[0], edges[-1] = positive.min(), positive.max()
+        counts, edges = np.histogram(positive, bins=edges)
+        return edges, counts, len(self) - len(positive)
+
+
+class SnapshotCache:
+    # Rebuilds the snapshot only when the repository's data_version() moves
+    def __init__(self, repository):
+        self.repository = repository
+        self.lock = threading.Lock()
+        self.version = None
+        self.snapshot = None
+
+    def get(self):
+        with self.lock:
+            version = self.repository.data_version()
+            if self.snapshot is None or version != self.version:
+                self.snapshot = InventorySnapshot(self.repository.all())
+                self.version = version
+            return self.snapshot
+
+
+# Headless report generation. Each report is computed from a snapshot into
+# a table (columns, rows) plus summary stats, then drawn with ChartManager
+# and written as PNG/CSV/JSON.
+
+REPORT_NAMES = ("summary", "low_stock", "category", "value")
+LOW_STOCK_CHART_ROWS = 25
+
+
+def summary_report(snapshot, options):
+    names, counts, totals = snapshot.category_totals()
+    return {
+        "title": "Inventory Value by Category",
+        "stats": {
+            "total_products": len(snapshot),
+            "total_value": snapshot.total_value(),
+            "low_stock": int(snapshot.low_stock_mask().sum()),
+            "out_of_stock": int(snapshot.out_of_stock_mask().sum())
+        },
+        "columns": ["category", "count", "total_value"],
+        "rows": [[n, int(c), float(t)] for n, c, t in zip(names, counts, totals)]
+    }
+
+
+def low_stock_report(snapshot, options):
+    rows = []
+    for i in snapshot.low_stock_order():
+        quantity, min_stock = int(snapshot.quantity[i]), int(snapshot.min_stock[i])
+        rows.append([int(snapshot.ids[i]), snapshot.names[i], snapshot.categories[snapshot.category_codes[i]],
+                     quantity, min_stock, max(min_stock - quantity, 0)])
+    return {
+        "title": "Low Stock Items Report",
+        "stats": {"low_stock": len(rows)},
+        "columns": ["id", "name", "category", "quantity", "min_stock", "to_order"],
+        "rows": rows
+    }
+
+
+def category_report(snapshot, options):
+    report = summary_report(snapshot, options)
+    report["title"] = "Category Analysis: Product Count vs. Inventory Value"
+    report["stats"] = {"categories": len(report["rows"])}
+    return report
+
+
+def value_report(snapshot, options):
+    top = snapshot.most_valuable()
+    stats = {
+        "total_value": snapshot.total_value(),
+        "most_valuable": {"name": top[0], "value": top[1]} if top else None,
+        "count": len(snapshot)
+    }
+
+    if options["value_mode"] == "histogram":
+        edges, counts, stats["unvalued"] = snapshot.value_histogram(options["bins"])
+        columns = ["low", "high", "count"]
+        rows = [[float(lo), float(hi), int(c)] for lo, hi, c in zip(edges[:-1], edges[1:], counts)]
+    else:
+        names, values = snapshot.top_values(options["top"])
+        columns = ["name", "value"]
+        rows = [[n, float(v)] for n, v in zip(names, values)]
+    return {"title": "Product Value Distribution", "stats": stats, "columns": columns, "rows": rows}
+
+
+REPORT_BUILDERS = {
+    "summary": summary_report,
+    "low_stock": low_stock_report,
+    "category": category_report,
+    "value": value_report
+}
+
+
+def draw_report(charts, name, report, options):
+    rows, title = report["rows"], report["title"]
+    if not rows:
+        charts.draw_empty(name, charts.figure(name, (10, 6)), title)
+    elif name == "summary":
+        charts.pie(name, [r[0] for r in rows], [r[2] for r in rows], title, colormap="Pastel1",
+                   textprops={'fontsize': 10}, title_style={'fontsize': 14, 'fontweight': 'bold'})
+    elif name == "low_stock":
+        shown = rows[:LOW_STOCK_CHART_ROWS]
+        charts.grouped_bars(name, [r[1] for r in shown], [
+            ('Current Stock', [r[3] for r in shown], '#f28e2b'),
+            ('Minimum Stock', [r[4] for r in shown], '#e15759')
+        ], title, 'Products', 'Quantity')
+    elif name == "category":
+        charts.bar_line(name, [r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows], title,
+                        'Categories', 'Number of Products', 'Total Inventory Value ($)',
+                        bar_legend='Product Count', line_legend='Total Value ($)')
+    elif options["value_mode"] == "histogram":
+        edges = np.array([r[0] for r in rows] + [rows[-1][1]])
+        charts.histogram(name, edges, np.array([r[2] for r in rows]), title,
+                         'Inventory Value per Product ($, log scale)', 'Number of Products')
+    else:
+        charts.labelled_bars(name, [r[0] for r in rows], [r[1] for r in rows], title,
+                             'Products', 'Inventory Value ($)')
+
+
+def generate_report(snapshot, name, formats, output_dir, options):
+    # Runs in a worker process; returns the paths written
+    report = REPORT_BUILDERS[name](snapshot, options)
+    paths = []
+
+    if "png" in formats:
+        import inventoryCharts
+
+        charts = inventoryCharts.ChartManager()
+        draw_report(charts, name, report, options)
+        path = os.path.join(output_dir, name + ".png")
+        with open(path, "wb") as f:
+            f.write(charts.render_png(name))
+        paths.append(path)
+
+    if "csv" in formats:
+        path = os.path.join(output_dir, name + ".csv")
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(report["columns"])
+            writer.writerows(report["rows"])
+        paths.append(path)
+
+    if "json" in formats:
+        path = os.path.join(output_dir, name + ".json")
+        atomic_write_json(path, {
+            "report": name,
+            "title": report["title"],
+            "stats": report["stats"],
+            "rows": [dict(zip(report["columns"], row)) for row in report["rows"]]
+        }, indent=2)
+        paths.append(path)
+    return paths
+
+
+def open_repository(backend, inventory_path, db_path, service_address):
+    if backend == "service":
+        import inventoryServer
+
+        return inventoryServer.InventoryClient(*inventoryServer.parse_address(service_address))
+    if backend == "sqlite":
+        import inventorySQLite
+
+        return inventorySQLite.SQLiteInventoryRepository(inventorySQLite.connect(db_path))
+
+    from inventoryStore import InventoryRepository
+
+    return InventoryRepository(inventory_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate InventoryPro reports without the GUI")
+    parser.add_argument("reports", nargs="*", metavar="report",
+                        help=f"one or more of {', '.join(REPORT_NAMES)} (default: all)")
+    parser.add_argument("--format", dest="formats", action="append", choices=["png", "csv", "json"],
+                        help="output format, may be repeated (default: png, csv and json)")
+    parser.add_argument("--output", default="reports", help="directory to write reports to")
+    parser.add_argument("--backend", choices=["json", "sqlite", "service"],
+                        default=os.environ.get("INVENTORY_BACKEND", "json"))
+    parser.add_argument("--inventory", default="inventory.json")
+    parser.add_argument("--db", default="inventory.db")
+    parser.add_argument("--service", default=os.environ.get("INVENTORY_SERVICE", "127.0.0.1:8765"),
+                        help="host:port of the inventory service")
+    parser.add_argument("--value-mode", choices=["top", "histogram"], default="top")
+    parser.add_argument("--top", type=int, default=20, help="products shown before \"Other\" (value report)")
+    parser.add_argument("--bins", type=int, default=20, help="histogram bins (value report)")
+    parser.add_argument("--jobs", type=int, default=min(len(REPORT_NAMES), os.cpu_count() or 1),
+                        help="worker processes (1 runs everything in this process)")
+    args = parser.parse_args()
+
+    import matplotlib
+
+    # Never try to open a window
+    matplotlib.use("Agg")
+
+    unknown = set(args.reports) - set(REPORT_NAMES)
+    if unknown:
+        parser.error(f"unknown report(s): {', '.join(sorted(unknown))}")
+
+    names = list(dict.fromkeys(args.reports)) or list(REPORT_NAMES)
+    formats = args.formats or ["png", "csv", "json"]
+    options = {"value_mode": args.value_mode, "top": args.top, "bins": args.bins}
+    os.makedirs(args.output, exist_ok=True)
+
+    start = time.perf_counter()
+    snapshot = InventorySnapshot(open_repository(args.backend, args.inventory, args.db, args.service).all())
+
+    # The snapshot is loaded once here and shipped to the workers
+    if args.jobs > 1 and len(names) > 1:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(names))) as executor:
+            futures = [executor.submit(generate_report, snapshot, name, formats, args.output, options)
+                       for name in names]
+            written = [path for future in futures for path in future.result()]
+    else:
+        written = [path for name in names for path in generate_report(snapshot, name, formats, args.output, options)]
+
+    for path in written:
+        print(path)
+    print(f"{len(names)} report(s) from {len(snapshot)} products in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,559 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from storageUtils import atomic_write_json
+from inventoryStore import TransactionJournal, check_version, password_matches, plan_stock_movements, tokenize
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    price REAL NOT NULL,
+    quantity INTEGER NOT NULL,
+    min_stock INTEGER NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    last_updated TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_products_category ON products (category);
+CREATE INDEX IF NOT EXISTS idx_products_name ON products (name);
+CREATE INDEX IF NOT EXISTS idx_products_stock_gap ON products (quantity - min_stock);
+CREATE INDEX IF NOT EXISTS idx_products_low_stock
+    ON products (CASE WHEN min_stock > 0 THEN CAST(quantity AS REAL) / min_stock ELSE 0 END, id)
+    WHERE quantity - min_stock <= 0;
+
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    user TEXT,
+    action TEXT NOT NULL,
+    product_id INTEGER,
+    product_name TEXT,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_product ON transactions (product_id);
+CREATE INDEX IF NOT EXISTS idx_transactions_timestamp ON transactions (timestamp);
+"""
+
+# External-content full-text index over products, kept in sync by triggers
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE products_fts USING fts5(
+    name, category, description, content='products', content_rowid='id', prefix='2 3'
+);
+CREATE TRIGGER products_fts_insert AFTER INSERT ON products BEGIN
+    INSERT INTO products_fts (rowid, name, category, description)
+    VALUES (new.id, new.name, new.category, new.description);
+END;
+CREATE TRIGGER products_fts_delete AFTER DELETE ON products BEGIN
+    INSERT INTO products_fts (products_fts, rowid, name, category, description)
+    VALUES ('delete', old.id, old.name, old.category, old.description);
+END;
+CREATE TRIGGER products_fts_update AFTER UPDATE ON products BEGIN
+    INSERT INTO products_fts (products_fts, rowid, name, category, description)
+    VALUES ('delete', old.id, old.name, old.category, old.description);
+    INSERT INTO products_fts (rowid, name, category, description)
+    VALUES (new.id, new.name, new.category, new.description);
+END;
+INSERT INTO products_fts (products_fts) VALUES ('rebuild');
+"""
+
+# Per-category totals maintained by triggers, so dashboard figures never scan products
+AGGREGATE_SCHEMA = """
+CREATE TABLE category_totals (
+    category TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    total_value REAL NOT NULL,
+    low_count INTEGER NOT NULL,
+    out_count INTEGER NOT NULL
+);
+CREATE TRIGGER category_totals_insert AFTER INSERT ON products BEGIN
+    INSERT INTO category_totals (category, count, total_value, low_count, out_count)
+    VALUES (new.category, 1, new.price * new.quantity, new.quantity <= new.min_stock, new.quantity <= 0)
+    ON CONFLICT (category) DO UPDATE SET
+        count = count + 1,
+        total_value = total_value + excluded.total_value,
+        low_count = low_count + excluded.low_count,
+        out_count = out_count + excluded.out_count;
+END;
+CREATE TRIGGER category_totals_delete AFTER DELETE ON products BEGIN
+    UPDATE category_totals SET
+        count = count - 1,
+        total_value = total_value - old.price * old.quantity,
+        low_count = low_count - (old.quantity <= old.min_stock),
+        out_count = out_count - (old.quantity <= 0)
+    WHERE category = old.category;
+    DELETE FROM category_totals WHERE category = old.category AND count = 0;
+END;
+CREATE TRIGGER category_totals_update AFTER UPDATE ON products BEGIN
+    UPDATE category_totals SET
+        count = count - 1,
+        total_value = total_value - old.price * old.quantity,
+        low_count = low_count - (old.quantity <= old.min_stock),
+        out_count = out_count - (old.quantity <= 0)
+    WHERE category = old.category;
+    DELETE FROM category_totals WHERE category = old.category AND count = 0;
+    INSERT INTO category_totals (category, count, total_value, low_count, out_count)
+    VALUES (new.category, 1, new.price * new.quantity, new.quantity <= new.min_stock, new.quantity <= 0)
+    ON CONFLICT (category) DO UPDATE SET
+        count = count + 1,
+        total_value = total_value + excluded.total_value,
+        low_count = low_count + excluded.low_count,
+        out_count = out_count + excluded.out_count;
+END;
+INSERT INTO category_totals
+SELECT category, COUNT(*), SUM(price * quantity), SUM(quantity <= min_stock), SUM(quantity <= 0)
+FROM products GROUP BY category;
+"""
+
+# Persistent product id high-water mark. Ids are never reused after a
+# delete, and the trigger keeps it ahead of ids inserted explicitly
+# (e.g. by import_json).
+SEQUENCE_SCHEMA = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT INTO meta VALUES ('next_product_id', (SELECT COALESCE(MAX(id), 0) + 1 FROM products));
+CREATE TRIGGER products_next_id AFTER INSERT ON products
+WHEN new.id >= (SELECT value FROM meta WHERE key = 'next_product_id') BEGIN
+    UPDATE meta SET value = new.id + 1 WHERE key = 'next_product_id';
+END;
+"""
+
+# Product change counter, the same on every connection (unlike
+# total_changes and PRAGMA data_version), for caches shared between threads
+VERSION_SCHEMA = """
+INSERT INTO meta VALUES ('data_version', 0);
+CREATE TRIGGER products_version_insert AFTER INSERT ON products BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'data_version';
+END;
+CREATE TRIGGER products_version_update AFTER UPDATE ON products BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'data_version';
+END;
+CREATE TRIGGER products_version_delete AFTER DELETE ON products BEGIN
+    UPDATE meta SET value = value + 1 WHERE key = 'data_version';
+END;
+"""
+
+# Same ordering as InventoryRepository.low_stock_items
+LOW_STOCK_ORDER = "CASE WHEN min_stock > 0 THEN CAST(quantity AS REAL) / min_stock ELSE 0 END, id"
+
+
+def open_connection(path):
+    # Closed from the thread that shuts the app down, not the one using it
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def connect(path="inventory.db"):
+    conn = open_connection(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+
+    # Databases created before per-product versions
+    columns = [row["name"] for row in conn.execute("PRAGMA table_info(products)")]
+    if "version" not in columns:
+        with conn:
+            conn.execute("ALTER TABLE products ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+    has_fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'products_fts'").fetchone()
+    if not has_fts:
+        conn.executescript(FTS_SCHEMA)
+
+    has_totals = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'category_totals'").fetchone()
+    if not has_totals:
+        conn.executescript(AGGREGATE_SCHEMA)
+
+    has_sequence = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'meta'").fetchone()
+    if not has_sequence:
+        conn.executescript(SEQUENCE_SCHEMA)
+
+    has_version = conn.execute("SELECT 1 FROM meta WHERE key = 'data_version'").fetchone()
+    if not has_version:
+        conn.executescript(VERSION_SCHEMA)
+    return conn
+
+
+def open_backend(path="inventory.db", inventory_path="inventory.json",
+                 transactions_path="transactions.jsonl", users_path="users.json"):
+    # Seed a new database from the JSON files on first use
+    is_new = not os.path.exists(path)
+    conn = connect(path)
+    if is_new:
+        if not os.path.exists(transactions_path) and os.path.exists("transactions.json"):
+            transactions_path = "transactions.json"
+        import_json(conn, inventory_path, transactions_path, users_path)
+
+    connections = ThreadConnections(conn)
+    return (SQLiteInventoryRepository(connections), SQLiteTransactionJournal(connections),
+            SQLiteUserStore(connections))
+
+
+class ThreadConnections:
+    # One connection per thread on the same database, starting from the one
+    # given for the thread that opened it. Report and bulk workers would
+    # otherwise share the UI thread's connection and its open transaction.
+    def __init__(self, conn):
+        self.local = threading.local()
+        self.local.conn = conn
+        self.all = [conn]
+        self.lock = threading.Lock()
+        # An in-memory database exists only on its own connection
+        self.path = conn.execute("PRAGMA database_list").fetchone()[2] or None
+
+    def get(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            if self.path is None:
+                return self.all[0]
+            conn = self.local.conn = open_connection(self.path)
+            with self.lock:
+                self.all.append(conn)
+        return conn
+
+    def close(self):
+        with self.lock:
+            for conn in self.all:
+                conn.close()
+            self.all = []
+
+
+def thread_connections(conn):
+    return conn if isinstance(conn, ThreadConnections) else ThreadConnections(conn)
+
+
+class SQLiteInventoryRepository:
+    def __init__(self, conn):
+        self.connections = thread_connections(conn)
+
+    @property
+    def conn(self):
+        return self.connections.get()
+
+    def data_version(self):
+        return self.conn.execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()[0]
+
+    def all(self):
+        rows = self.conn.execute("SELECT * FROM products ORDER BY id")
+        return [dict(row) for row in rows]
+
+    def get(self, product_id):
+        row = self.conn.execute("SELECT * FROM products WHERE id = ?", (product_id,)).fetchone()
+        return dict(row) if row else None
+
+    def ids(self):
+        return [row[0] for row in self.conn.execute("SELECT id FROM products ORDER BY id")]
+
+    def get_many(self, product_ids):
+        product_ids = list(product_ids)
+        products = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(product_ids), 500):
+            chunk = product_ids[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT * FROM products WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            products.update((row["id"], dict(row)) for row in rows)
+        return [products[i] for i in product_ids if i in products]
+
+    def count(self):
+        return self.conn.execute("SELECT COALESCE(SUM(count), 0) FROM category_totals").fetchone()[0]
+
+    def categories(self):
+        rows = self.conn.execute("SELECT category FROM category_totals ORDER BY category")
+        return [row[0] for row in rows]
+
+    def search(self, query, limit=None):
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        # Prefix match on every term, name weighted above category and description
+        match = " ".join(f'"{term}"*' for term in terms)
+        rows = self.conn.execute(
+            "SELECT rowid FROM products_fts WHERE products_fts MATCH ? "
+            "ORDER BY bm25(products_fts, 3.0, 2.0, 1.0), rowid LIMIT ?",
+            (match, limit or -1))
+        results = [row[0] for row in rows]
+
+        # A bare number is also tried as a product id
+        if len(terms) == 1 and terms[0].isdigit() and self.get(int(terms[0])):
+            product_id = int(terms[0])
+            results = [product_id] + [pid for pid in results if pid != product_id]
+        return results[:limit] if limit else results
+
+    def ids_in_category(self, category):
+        rows = self.conn.execute("SELECT id FROM products WHERE category = ? ORDER BY id", (category,))
+        return [row[0] for row in rows]
+
+    def category_counts(self):
+        rows = self.conn.execute("SELECT category, count FROM category_totals")
+        return {row[0]: row[1] for row in rows}
+
+    def total_value(self):
+        return self.conn.execute("SELECT COALESCE(SUM(total_value), 0) FROM category_totals").fetchone()[0]
+
+    def low_stock_count(self):
+        return self.conn.execute("SELECT COALESCE(SUM(low_count), 0) FROM category_totals").fetchone()[0]
+
+    def out_of_stock_count(self):
+        return self.conn.execute("SELECT COALESCE(SUM(out_count), 0) FROM category_totals").fetchone()[0]
+
+    def low_stock_items(self, limit=None, offset=0):
+        # Served in order straight from the partial idx_products_low_stock index
+        rows = self.conn.execute(
+            f"SELECT * FROM products WHERE quantity - min_stock <= 0 ORDER BY {LOW_STOCK_ORDER} "
+            "LIMIT ? OFFSET ?", (-1 if limit is None else limit, offset))
+        return [dict(row) for row in rows]
+
+    def category_summary(self):
+        rows = self.conn.execute("SELECT category, count, total_value FROM category_totals")
+        return {row["category"]: {"count": row["count"], "total_value": row["total_value"]} for row in rows}
+
+    @contextmanager
+    def writing(self):
+        # BEGIN IMMEDIATE takes the write lock before anything is read, so
+        # rows checked inside cannot change under us before we write
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+
+    def add(self, fields):
+        return self.add_many([fields])[0]
+
+    def add_many(self, fields_list):
+        # One id block and one commit for the whole batch
+        fields_list = list(fields_list)
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        with self.writing():
+            self.conn.execute("UPDATE meta SET value = value + ? WHERE key = 'next_product_id'",
+                              (len(fields_list),))
+            start = self.conn.execute(
+                "SELECT value FROM meta WHERE key = 'next_product_id'").fetchone()[0] - len(fields_list)
+            products = []
+            for i, fields in enumerate(fields_list):
+                product = {"id": start + i}
+                product.update(fields)
+                product["last_updated"] = timestamp
+                product["version"] = 1
+                products.append(product)
+            self.conn.executemany(
+                "INSERT INTO products (id, name, category, price, quantity, min_stock, description, last_updated, "
+                "version) VALUES (:id, :name, :category, :price, :quantity, :min_stock, :description, "
+                ":last_updated, :version)",
+                products)
+
+        return products
+
+    def update(self, product_id, fields, expected_version=None):
+        new_product = {"id": product_id}
+        new_product.update(fields)
+        new_product["last_updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        with self.writing():
+            old_product = self.get(product_id)
+            if old_product is None:
+                raise ValueError("Product not found")
+            check_version(old_product, expected_version)
+            new_product["version"] = old_product["version"] + 1
+
+            self.conn.execute(
+                "UPDATE products SET name = :name, category = :category, price = :price, "
+                "quantity = :quantity, min_stock = :min_stock, description = :description, "
+                "last_updated = :last_updated, version = :version WHERE id = :id",
+                new_product)
+
+        return old_product, new_product
+
+    def delete(self, product_id, expected_version=None):
+        with self.writing():
+            product = self.get(product_id)
+            if product is None:
+                raise ValueError("Product not found")
+            check_version(product, expected_version)
+            self.conn.execute("DELETE FROM products WHERE id = ?", (product_id,))
+
+        return product
+
+    def adjust_stock(self, product_id, delta):
+        return self.apply_stock_movements([(product_id, delta)])[0]
+
+    def apply_stock_movements(self, movements):
+        # Checked in full, then applied in a single transaction
+        movements = list(movements)
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        with self.writing():
+            products = {p["id"]: p for p in self.get_many(dict.fromkeys(pid for pid, _ in movements))}
+            updated = plan_stock_movements(products, movements)
+            for product in updated.values():
+                product["last_updated"] = timestamp
+                product["version"] += 1
+            self.conn.executemany("UPDATE products SET quantity = ?, last_updated = ?, version = ? WHERE id = ?",
+                                  [(p["quantity"], timestamp, p["version"], p["id"]) for p in updated.values()])
+
+        return list(updated.values())
+
+
+INSERT_TRANSACTION = ("INSERT INTO transactions (timestamp, user, action, product_id, product_name, details) "
+                      "VALUES (?, ?, ?, ?, ?, ?)")
+
+
+def transaction_row(entry):
+    return (entry["timestamp"], entry.get("user"), entry["action"], entry.get("product_id"),
+            entry.get("product_name"), json.dumps(entry.get("details")))
+
+
+def import_transactions(conn, entries):
+    # Entries already in the table are skipped, so importing the same
+    # journal again adds nothing. They match on (timestamp, action,
+    # product_id, user), counting repeats: one user can log identical
+    # entries within the same second.
+    remaining = {}
+    for entry in entries:
+        row = transaction_row(entry)
+        key = (row[0], row[2], row[3], row[1])
+        if key not in remaining:
+            remaining[key] = conn.execute(
+                "SELECT COUNT(*) FROM transactions "
+                "WHERE timestamp = ? AND action = ? AND product_id IS ? AND user IS ?", key).fetchone()[0]
+        if remaining[key]:
+            remaining[key] -= 1
+        else:
+            conn.execute(INSERT_TRANSACTION, row)
+
+
+class SQLiteTransactionJournal:
+    def __init__(self, conn):
+        self.connections = thread_connections(conn)
+
+    @property
+    def conn(self):
+        return self.connections.get()
+
+    def append(self, entry):
+        with self.conn:
+            self.conn.execute(INSERT_TRANSACTION, transaction_row(entry))
+
+    def row_to_entry(self, row):
+        entry = dict(row)
+        del entry["seq"]
+        entry["details"] = json.loads(entry["details"]) if entry["details"] else None
+        return entry
+
+    def __iter__(self):
+        for row in self.conn.execute("SELECT * FROM transactions ORDER BY seq"):
+            yield self.row_to_entry(row)
+
+    def recent(self, count):
+        rows = self.conn.execute("SELECT * FROM transactions ORDER BY seq DESC LIMIT ?", (count,))
+        return [self.row_to_entry(row) for row in rows]
+
+    def close(self):
+        self.connections.close()
+
+
+class SQLiteUserStore:
+    def __init__(self, conn):
+        self.connections = thread_connections(conn)
+
+    @property
+    def conn(self):
+        return self.connections.get()
+
+    def check_password(self, username, password):
+        row = self.conn.execute("SELECT password FROM users WHERE username = ?", (username,)).fetchone()
+        return password_matches(row[0] if row else None, password)
+
+
+def import_json(conn, inventory_path="inventory.json", transactions_path="transactions.jsonl",
+                users_path="users.json"):
+    # Accepts the current JSON formats; transactions may be the JSON-lines
+    # journal or the old single-array transactions.json
+    with conn:
+        if inventory_path and os.path.exists(inventory_path):
+            with open(inventory_path, "r") as f:
+                inventory = json.load(f)
+            # An upsert rather than INSERT OR REPLACE: REPLACE deletes the
+            # old row without firing the delete triggers, which would leave
+            # stale entries in products_fts and category_totals
+            conn.executemany(
+                "INSERT INTO products "
+                "(id, name, category, price, quantity, min_stock, description, last_updated, version) VALUES "
+                "(:id, :name, :category, :price, :quantity, :min_stock, :description, :last_updated, :version) "
+                "ON CONFLICT (id) DO UPDATE SET "
+                "name = excluded.name, category = excluded.category, price = excluded.price, "
+                "quantity = excluded.quantity, min_stock = excluded.min_stock, "
+                "description = excluded.description, last_updated = excluded.last_updated, "
+                "version = excluded.version",
+                [dict({"description": "", "version": 0}, **p) for p in inventory])
+
+        if users_path and os.path.exists(users_path):
+            with open(users_path, "r") as f:
+                users = json.load(f)
+            conn.executemany("INSERT OR REPLACE INTO users VALUES (?, ?)", users.items())
+
+    if transactions_path and os.path.exists(transactions_path):
+        if transactions_path.endswith(".jsonl"):
+            journal = TransactionJournal(transactions_path, legacy_path=None)
+            with conn:
+                import_transactions(conn, journal)
+            journal.close()
+        else:
+            with open(transactions_path, "r") as f:
+                transactions = json.load(f)
+            with conn:
+                import_transactions(conn, transactions)
+
+
+def export_json(conn, inventory_path="inventory.json", transactions_path="transactions.json",
+                users_path="users.json"):
+    repository = SQLiteInventoryRepository(conn)
+    atomic_write_json(inventory_path, repository.all(), indent=2)
+
+    if users_path:
+        users = {row["username"]: row["password"] for row in conn.execute("SELECT * FROM users")}
+        atomic_write_json(users_path, users)
+
+    if transactions_path:
+        atomic_write_json(transactions_path, list(SQLiteTransactionJournal(conn)), indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import/export the InventoryPro SQLite database")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("--db", default="inventory.db")
+    parser.add_argument("--inventory", default="inventory.json")
+    parser.add_argument("--transactions", default=None,
+                        help="transactions file (default: transactions.jsonl on import, "
+                             "transactions.json on export)")
+    parser.add_argument("--users", default="users.json")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    if args.command == "import":
+        import_json(conn, args.inventory, args.transactions or "transactions.jsonl", args.users)
+    else:
+        export_json(conn, args.inventory, args.transactions or "transactions.json", args.users)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+import argparse
+import asyncio
+import json
+import signal
+import socket
+import threading
+
+from inventoryStore import ConflictError, InventoryRepository, TransactionJournal, UserStore
+
+# The service listens on localhost only
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Largest request line accepted (bulk imports send whole batches at once)
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+# Repository methods clients may call, by name
+REPOSITORY_METHODS = frozenset([
+    "all", "get", "ids", "get_many", "count", "categories", "ids_in_category", "category_counts", "search",
+    "total_value", "low_stock_count", "out_of_stock_count", "low_stock_items", "category_summary",
+    "data_version", "add", "add_many", "update", "delete", "adjust_stock", "apply_stock_movements"
+])
+JOURNAL_METHODS = frozenset(["append", "recent"])
+# Only a yes/no answer: stored passwords never leave the service
+USER_METHODS = frozenset(["check_password"])
+
+# Error types sent over the wire, and what the client raises for them
+ERROR_TYPES = {"ConflictError": ConflictError, "ValueError": ValueError}
+
+
+def parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or DEFAULT_HOST, int(port)
+
+
+class InventoryService:
+    # Owns one repository, journal and user store and answers JSON-lines
+    # requests: {"method": name, "params": [...]}, or a list of them for a
+    # batch, answered with {"result": ...} or {"error": {"type", "message"}}.
+    # Requests run one at a time on the event loop, so the in-memory data
+    # has a single writer.
+    def __init__(self, repository, journal, users):
+        self.repository = repository
+        self.journal = journal
+        self.users = users
+        self.snapshots = None
+
+    def dispatch(self, method, params):
+        if method in REPOSITORY_METHODS:
+            return getattr(self.repository, method)(*params)
+
+        target, _, name = method.partition(".")
+        if target == "journal" and name in JOURNAL_METHODS:
+            return getattr(self.journal, name)(*params)
+        if target == "users" and name in USER_METHODS:
+            return getattr(self.users, name)(*params)
+        if method == "report":
+            return self.report(*params)
+        raise ValueError(f"Unknown method '{method}'")
+
+    def report(self, name, options=None):
+        # Report tables computed from a snapshot cached between requests
+        import inventoryReports
+
+        if name not in inventoryReports.REPORT_BUILDERS:
+            raise ValueError(f"Unknown report '{name}'")
+        if self.snapshots is None:
+            self.snapshots = inventoryReports.SnapshotCache(self.repository)
+
+        options = dict({"value_mode": "top", "top": 20, "bins": 20}, **(options or {}))
+        return inventoryReports.REPORT_BUILDERS[name](self.snapshots.get(), options)
+
+    def handle(self, request):
+        try:
+            return {"result": self.dispatch(request["method"], request.get("params", []))}
+        except ConflictError as e:
+            return {"error": {"type": "ConflictError", "message": str(e)}}
+        except ValueError as e:
+            return {"error": {"type": "ValueError", "message": str(e)}}
+        except Exception as e:
+            return {"error": {"type": type(e).__name__, "message": str(e)}}
+
+    async def serve_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                message = json.loads(line)
+                if isinstance(message, list):
+                    response = [self.handle(request) for request in message]
+                else:
+                    response = self.handle(message)
+
+                writer.write(json.dumps(response, separators=(",", ":")).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass  # client went away or sent garbage; drop the connection
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.serve_client, host, port, limit=MAX_MESSAGE_BYTES)
+
+        # Stop cleanly on SIGTERM too, so the journal gets its final fsync
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, server.close)
+        except (NotImplementedError, AttributeError):
+            pass  # Windows
+
+        async with server:
+            try:
+                await server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+
+
+class InventoryClient:
+    # Repository interface backed by the inventory service. Safe to share
+    # between threads; each request holds the connection for its round trip.
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=60):
+        self.address = (host, port)
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.connect()
+
+    def connect(self):
+        self.sock = socket.create_connection(self.address, self.timeout)
+        self.file = self.sock.makefile("rwb")
+
+    def disconnect(self):
+        self.file.close()
+        self.sock.close()
+        self.file = None
+
+    def send(self, message):
+        with self.lock:
+            if self.file is None:
+                self.connect()
+            try:
+                self.file.write(json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n")
+                self.file.flush()
+                line = self.file.readline()
+            except OSError:
+                # A timed-out socket file cannot be read again, and a late
+                # reply would answer the wrong request: drop the connection
+                # so the next call opens a fresh one
+                self.disconnect()
+                raise
+            if not line:
+                self.disconnect()
+                raise ConnectionError("Inventory service closed the connection")
+        return json.loads(line)
+
+    def call(self, method, *params):
+        return unwrap(self.send({"method": method, "params": list(params)}))
+
+    def call_many(self, calls):
+        # Several (method, *params) calls in one round trip
+        responses = self.send([{"method": method, "params": list(params)} for method, *params in calls])
+        return [unwrap(response) for response in responses]
+
+    def __getattr__(self, name):
+        if name in REPOSITORY_METHODS:
+            return lambda *params: self.call(name, *params)
+        raise AttributeError(name)
+
+    def update(self, product_id, fields, expected_version=None):
+        old_product, new_product = self.call("update", product_id, fields, expected_version)
+        return old_product, new_product
+
+    def report(self, name, options=None):
+        return self.call("report", name, options)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.disconnect()
+
+
+class RemoteJournal:
+    def __init__(self, client):
+        self.client = client
+
+    def append(self, entry):
+        self.client.call("journal.append", entry)
+
+    def recent(self, count):
+        return self.client.call("journal.recent", count)
+
+    def close(self):
+        # The journal is the last thing the app closes
+        self.client.close()
+
+
+class RemoteUserStore:
+    def __init__(self, client):
+        self.client = client
+
+    def check_password(self, username, password):
+        return self.client.call("users.check_password", username, password)
+
+
+def connect_backend(address):
+    # Same (repository, journal, users) triple as the local backends
+    client = InventoryClient(*parse_address(address))
+    return client, RemoteJournal(client), RemoteUserStore(client)
+
+
+def unwrap(response):
+    error = response.get("error")
+    if error is not None:
+        raise ERROR_TYPES.get(error["type"], RuntimeError)(error["message"])
+    return response["result"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve an InventoryPro data directory to local clients")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--inventory", default="inventory.json")
+    parser.add_argument("--db", default="inventory.db")
+    parser.add_argument("--transactions", default="transactions.jsonl")
+    parser.add_argument("--users", default="users.json")
+    args = parser.parse_args()
+
+    if args.backend == "sqlite":
+        import inventorySQLite
+
+        repository, journal, users = inventorySQLite.open_backend(
+            args.db, args.inventory, args.transactions, args.users)
+    else:
+        repository = InventoryRepository(args.inventory)
+        journal = TransactionJournal(args.transactions)
+        users = UserStore(args.users)
+
+    print(f"Serving {args.backend} inventory on {args.host}:{args.port}")
+    try:
+        asyncio.run(InventoryService(repository, journal, users).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        journal.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,610 @@
+import bisect
+import glob
+import hmac
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from storageUtils import FileLock, IdSequence, atomic_write_json, read_lines_reversed
+
+
+# Relative weight of a match in each field when ranking search results
+SEARCH_FIELD_WEIGHTS = {"name": 3, "category": 2, "description": 1}
+SEARCH_ID_WEIGHT = 5
+
+
+def tokenize(text):
+    return re.findall(r"\w+", str(text).lower())
+
+
+class ConflictError(ValueError):
+    # A compare-and-swap write found the product changed since it was read
+    pass
+
+
+def check_version(product, expected_version):
+    # Products written before versioning count as version 0
+    if expected_version is not None and product.get("version", 0) != expected_version:
+        raise ConflictError(f"{product['name']} was changed by another user. Reload it and try again.")
+
+
+def password_matches(stored_password, password):
+    # Constant-time, so response timing does not leak how much matched
+    return stored_password is not None and hmac.compare_digest(
+        stored_password.encode("utf-8"), password.encode("utf-8"))
+
+
+def validate_product_fields(fields):
+    # The product form's rules, shared with bulk import. Accepts raw strings
+    # or numbers and returns the cleaned editable fields.
+    name = str(fields.get("name") or "").strip()
+    if not name:
+        raise ValueError("Product name is required")
+
+    category = str(fields.get("category") or "").strip()
+    if not category:
+        raise ValueError("Category is required")
+
+    price = float(str(fields.get("price", "")).strip())
+    if not price > 0:
+        raise ValueError("Price must be positive")
+
+    quantity = int(str(fields.get("quantity", "")).strip())
+    if quantity < 0:
+        raise ValueError("Quantity cannot be negative")
+
+    min_stock = int(str(fields.get("min_stock", "")).strip())
+    if min_stock < 0:
+        raise ValueError("Minimum stock cannot be negative")
+
+    return {
+        "name": name,
+        "category": category,
+        "price": price,
+        "quantity": quantity,
+        "min_stock": min_stock,
+        "description": str(fields.get("description") or "").strip()
+    }
+
+
+class SearchIndex:
+    def __init__(self, products=()):
+        self.postings = {}       # token -> {product_id: weight}
+        self.documents = {}      # product_id -> {token: weight}
+
+        # Built in one pass and sorted once; add() keeps it sorted after that
+        for product in products:
+            tokens = self.product_tokens(product)
+            self.documents[product["id"]] = tokens
+            for token, weight in tokens.items():
+                self.postings.setdefault(token, {})[product["id"]] = weight
+        self.sorted_tokens = sorted(self.postings)  # for prefix lookups
+
+    def product_tokens(self, product):
+        # Ids are matched directly in search(), not indexed as tokens
+        tokens = {}
+        for field, weight in SEARCH_FIELD_WEIGHTS.items():
+            for token in tokenize(product.get(field, "")):
+                tokens[token] = max(tokens.get(token, 0), weight)
+        return tokens
+
+    def add(self, product):
+        self.remove(product["id"])
+
+        tokens = self.product_tokens(product)
+        self.documents[product["id"]] = tokens
+        for token, weight in tokens.items():
+            if token not in self.postings:
+                self.postings[token] = {}
+                bisect.insort(self.sorted_tokens, token)
+            self.postings[token][product["id"]] = weight
+
+    def remove(self, product_id):
+        for token in self.documents.pop(product_id, {}):
+            posting = self.postings[token]
+            del posting[product_id]
+            if not posting:
+                del self.postings[token]
+                del self.sorted_tokens[bisect.bisect_left(self.sorted_tokens, token)]
+
+    def prefix_tokens(self, prefix):
+        start = bisect.bisect_left(self.sorted_tokens, prefix)
+        for token in self.sorted_tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            yield token
+
+    def search(self, query, limit=None):
+        scores = None
+        for term in set(tokenize(query)):
+            # Whole-token matches count double, prefix matches once
+            term_scores = {}
+            for token in self.prefix_tokens(term):
+                boost = 2 if token == term else 1
+                for product_id, weight in self.postings[token].items():
+                    term_scores[product_id] = max(term_scores.get(product_id, 0), weight * boost)
+
+            # A number also matches the product with that id
+            if term.isdigit() and int(term) in self.documents:
+                product_id = int(term)
+                term_scores[product_id] = max(term_scores.get(product_id, 0), SEARCH_ID_WEIGHT * 2)
+
+            # Every term has to match
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {pid: score + term_scores[pid] for pid, score in scores.items() if pid in term_scores}
+            if not scores:
+                return []
+
+        if scores is None:
+            return []
+        ranked = sorted(scores, key=lambda pid: (-scores[pid], pid))
+        return ranked[:limit] if limit else ranked
+
+
+def low_stock_key(product):
+    # Most critical first: lowest share of the minimum stock remaining
+    ratio = (product["quantity"] / product["min_stock"]) if product["min_stock"] > 0 else 0
+    return (ratio, product["id"])
+
+
+class LowStockIndex:
+    # Products at or below their minimum stock, kept sorted by low_stock_key
+    def __init__(self):
+        self.keys = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, product):
+        if product["quantity"] <= product["min_stock"]:
+            bisect.insort(self.keys, low_stock_key(product))
+
+    def remove(self, product):
+        if product["quantity"] <= product["min_stock"]:
+            key = low_stock_key(product)
+            position = bisect.bisect_left(self.keys, key)
+            if position < len(self.keys) and self.keys[position] == key:
+                del self.keys[position]
+
+    def top(self, limit=None, offset=0):
+        end = None if limit is None else offset + limit
+        return [product_id for _, product_id in self.keys[offset:end]]
+
+
+class InventoryAggregates:
+    # Dashboard totals, updated by the delta of each product write
+    def __init__(self):
+        self.total_value = 0
+        self.categories = {}  # category -> {"count", "total_value"}
+        self.low_stock = LowStockIndex()
+        self.out_of_stock = set()
+
+    def add(self, product):
+        value = product["price"] * product["quantity"]
+        self.total_value += value
+
+        category = self.categories.setdefault(product["category"], {"count": 0, "total_value": 0})
+        category["count"] += 1
+        category["total_value"] += value
+
+        self.low_stock.add(product)
+        if product["quantity"] <= 0:
+            self.out_of_stock.add(product["id"])
+
+    def remove(self, product):
+        value = product["price"] * product["quantity"]
+        self.total_value -= value
+
+        category = self.categories[product["category"]]
+        category["count"] -= 1
+        category["total_value"] -= value
+        if not category["count"]:
+            del self.categories[product["category"]]
+        if not self.categories:
+            # Drop any accumulated float error once the inventory is empty
+            self.total_value = 0
+
+        self.low_stock.remove(product)
+        self.out_of_stock.discard(product["id"])
+
+
+class InventoryRepository:
+    def __init__(self, path="inventory.json"):
+        self.path = path
+        self.products = {}
+        self.file_state = None
+        self.version = 0  # bumped on every product change, including reloads
+        self.next_id = 1  # lowest id not used by any product we have seen
+        self.sequence = IdSequence(os.path.splitext(path)[0] + ".seq")
+        self.lock = FileLock(os.path.splitext(path)[0] + ".lock")
+        # Report and bulk workers use the repository from other threads;
+        # reloads and writes rebuild the indexes, so every access holds this
+        self.state_lock = threading.RLock()
+        self.load()
+
+    def load(self):
+        with open(self.path, "r") as f:
+            inventory = json.load(f)
+
+        # Keep products keyed by id, in file order
+        self.products = {}
+        self.category_index = {}  # category -> {product_id: None}
+        self.aggregates = InventoryAggregates()
+        self.file_state = self.stat_file()
+
+        # Built on the first search, then maintained on every write
+        self.search_index = None
+
+        for product in inventory:
+            self.put_product(product)
+
+    def stat_file(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        # Every save replaces the file, so the inode changes even when the
+        # mtime and size happen to match
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def reload_if_changed(self):
+        # Pick up edits made by another process since our last load/save
+        state = self.stat_file()
+        if state is not None and state != self.file_state:
+            self.load()
+
+    def save(self):
+        atomic_write_json(self.path, list(self.products.values()))
+        self.file_state = self.stat_file()
+
+    @contextmanager
+    def reading(self):
+        with self.state_lock:
+            self.reload_if_changed()
+            yield
+
+    @contextmanager
+    def writing(self):
+        # Writers hold the cross-process lock and start from the file's
+        # latest contents, so a concurrent writer's changes are never lost
+        with self.lock, self.state_lock:
+            self.reload_if_changed()
+            yield
+
+    def put_product(self, product):
+        # Store a product and keep the secondary indexes in step
+        old_product = self.products.get(product["id"])
+        self.products[product["id"]] = product
+        self.version += 1
+        self.next_id = max(self.next_id, product["id"] + 1)
+
+        if old_product is not None:
+            self.aggregates.remove(old_product)
+        self.aggregates.add(product)
+
+        if old_product is None or old_product["category"] != product["category"]:
+            if old_product is not None:
+                self.unindex_category(old_product)
+            self.category_index.setdefault(product["category"], {})[product["id"]] = None
+
+        if self.search_index is not None:
+            self.search_index.add(product)
+
+    def pop_product(self, product_id):
+        product = self.products.pop(product_id, None)
+        if product is None:
+            return None
+
+        self.version += 1
+        self.aggregates.remove(product)
+        self.unindex_category(product)
+        if self.search_index is not None:
+            self.search_index.remove(product_id)
+        return product
+
+    def unindex_category(self, product):
+        ids = self.category_index[product["category"]]
+        del ids[product["id"]]
+        if not ids:
+            del self.category_index[product["category"]]
+
+    def data_version(self):
+        with self.reading():
+            return self.version
+
+    def all(self):
+        with self.reading():
+            return list(self.products.values())
+
+    def get(self, product_id):
+        with self.reading():
+            return self.products.get(product_id)
+
+    def ids(self):
+        with self.reading():
+            return list(self.products)
+
+    def get_many(self, product_ids):
+        with self.reading():
+            return [self.products[i] for i in product_ids if i in self.products]
+
+    def count(self):
+        with self.reading():
+            return len(self.products)
+
+    def categories(self):
+        with self.reading():
+            return sorted(self.category_index)
+
+    def ids_in_category(self, category):
+        with self.reading():
+            return sorted(self.category_index.get(category, ()))
+
+    def category_counts(self):
+        with self.reading():
+            return {category: len(ids) for category, ids in self.category_index.items()}
+
+    def search(self, query, limit=None):
+        with self.reading():
+            if self.search_index is None:
+                self.search_index = SearchIndex(self.products.values())
+            return self.search_index.search(query, limit)
+
+    def total_value(self):
+        with self.reading():
+            return self.aggregates.total_value
+
+    def low_stock_count(self):
+        with self.reading():
+            return len(self.aggregates.low_stock)
+
+    def out_of_stock_count(self):
+        with self.reading():
+            return len(self.aggregates.out_of_stock)
+
+    def low_stock_items(self, limit=None, offset=0):
+        with self.reading():
+            return [self.products[i] for i in self.aggregates.low_stock.top(limit, offset)]
+
+    def category_summary(self):
+        with self.reading():
+            return {category: dict(totals) for category, totals in self.aggregates.categories.items()}
+
+    def reserve_ids(self, count):
+        # Hand out a block of consecutive new ids from the shared sequence
+        start = self.sequence.reserve(count, floor=self.next_id)
+        self.next_id = start + count
+        return range(start, start + count)
+
+    def add(self, fields):
+        return self.add_many([fields])[0]
+
+    def add_many(self, fields_list):
+        # One id block and one save for the whole batch
+        fields_list = list(fields_list)
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        products = []
+
+        with self.writing():
+            for new_id, fields in zip(self.reserve_ids(len(fields_list)), fields_list):
+                product = {"id": new_id}
+                product.update(fields)
+                product["last_updated"] = timestamp
+                product["version"] = 1
+                self.put_product(product)
+                products.append(product)
+
+            self.save()
+        return products
+
+    def update(self, product_id, fields, expected_version=None):
+        # With expected_version, only succeeds if nobody has changed the
+        # product since that version was read (else ConflictError)
+        with self.writing():
+            old_product = self.products.get(product_id)
+            if old_product is None:
+                raise ValueError("Product not found")
+            check_version(old_product, expected_version)
+
+            new_product = {"id": product_id}
+            new_product.update(fields)
+            new_product["last_updated"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            new_product["version"] = old_product.get("version", 0) + 1
+
+            self.put_product(new_product)
+            self.save()
+        return old_product, new_product
+
+    def delete(self, product_id, expected_version=None):
+        with self.writing():
+            product = self.products.get(product_id)
+            if product is None:
+                raise ValueError("Product not found")
+            check_version(product, expected_version)
+
+            self.pop_product(product_id)
+            self.save()
+        return product
+
+    def adjust_stock(self, product_id, delta):
+        return self.apply_stock_movements([(product_id, delta)])[0]
+
+    def apply_stock_movements(self, movements):
+        # Apply (product_id, delta) movements all-or-nothing: every movement
+        # is checked before anything changes, then the file is written once.
+        # Returns the updated products, one per distinct product in order.
+        # Deltas are applied to the latest quantities under the lock, so
+        # concurrent movements on the same product add up rather than conflict
+        with self.writing():
+            updated = plan_stock_movements(self.products, movements)
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            for product in updated.values():
+                product["last_updated"] = timestamp
+                product["version"] = product.get("version", 0) + 1
+                self.put_product(product)
+
+            self.save()
+        return list(updated.values())
+
+
+def plan_stock_movements(products, movements):
+    # Validate movements against a product mapping and return updated copies
+    # keyed by id. Movements apply in order, so a product may be topped up
+    # and picked in the same batch, but never drop below zero on the way.
+    updated = {}
+    for product_id, delta in movements:
+        product = updated.get(product_id)
+        if product is None:
+            if product_id not in products:
+                raise ValueError(f"Product {product_id} not found")
+            product = updated[product_id] = dict(products[product_id])
+
+        if product["quantity"] + delta < 0:
+            raise ValueError(f"Not enough stock to remove for {product['name']} (ID {product_id})")
+        product["quantity"] += delta
+    return updated
+
+
+class UserStore:
+    def __init__(self, path="users.json"):
+        self.path = path
+
+    def check_password(self, username, password):
+        with open(self.path, "r") as f:
+            users = json.load(f)
+        return password_matches(users.get(username), password)
+
+
+class TransactionJournal:
+    def __init__(self, path="transactions.jsonl", legacy_path="transactions.json",
+                 fsync_every=20, fsync_interval=1.0, segment_bytes=16 * 1024 * 1024):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.segment_bytes = segment_bytes
+
+        # Serialises migration, appends and rotation between processes
+        # sharing the journal
+        self.lock = FileLock(self.path + ".lock")
+        with self.lock:
+            self.migrate(legacy_path)
+
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def migrate(self, legacy_path):
+        # One-time conversion of the old transactions.json array
+        if os.path.exists(self.path) or not legacy_path or not os.path.exists(legacy_path):
+            return
+
+        with open(legacy_path, "r") as f:
+            transactions = json.load(f)
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for transaction in transactions:
+                f.write(json.dumps(transaction, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp_path, self.path)
+        os.replace(legacy_path, legacy_path + ".migrated")
+
+    def append(self, entry):
+        with self.lock:
+            self.reopen_if_rotated()
+            self.file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self.file.flush()
+            self.pending += 1
+
+            # Batch fsyncs by count or elapsed time
+            if self.pending >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_interval:
+                self.sync()
+
+            if self.file.tell() >= self.segment_bytes:
+                self.rotate()
+
+    def reopen_if_rotated(self):
+        # Another process may have archived the file we have open
+        try:
+            current = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            current = None
+        if current != os.fstat(self.file.fileno()).st_ino:
+            self.sync()
+            self.file.close()
+            self.file = open(self.path, "a", encoding="utf-8")
+
+    def sync(self):
+        if self.pending:
+            os.fsync(self.file.fileno())
+            self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def segment_path(self, number):
+        root, ext = os.path.splitext(self.path)
+        return f"{root}.{number:06d}{ext}"
+
+    def archived_segments(self):
+        root, ext = os.path.splitext(self.path)
+        return sorted(glob.glob(f"{glob.escape(root)}.[0-9][0-9][0-9][0-9][0-9][0-9]{ext}"))
+
+    def rotate(self):
+        with self.lock:
+            self.sync()
+            self.file.close()
+
+            segments = self.archived_segments()
+            number = 1
+            if segments:
+                number = int(os.path.splitext(segments[-1])[0].rsplit(".", 1)[1]) + 1
+            os.replace(self.path, self.segment_path(number))
+
+            self.file = open(self.path, "a", encoding="utf-8")
+
+    def segments(self):
+        return self.archived_segments() + [self.path]
+
+    def __iter__(self):
+        # Oldest first, one line at a time
+        for segment in self.segments():
+            with open(segment, "r", encoding="utf-8") as f:
+                for line in f:
+                    entry = parse_journal_line(line)
+                    if entry is not None:
+                        yield entry
+
+    def recent(self, count):
+        # Newest first, reading segments backwards from the end
+        entries = []
+        for segment in reversed(self.segments()):
+            for line in read_lines_reversed(segment):
+                entry = parse_journal_line(line)
+                if entry is not None:
+                    entries.append(entry)
+                    if len(entries) >= count:
+                        return entries
+        return entries
+
+    def close(self):
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+
+
+def parse_journal_line(line):
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except ValueError:
+        # Torn final line from an interrupted write
+        return None
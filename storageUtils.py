@@ -0,0 +1,164 @@
+import json
+import os
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Process umask, read once: os.umask can only be read by setting it
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def atomic_write_json(path, data, indent=None):
+    # Write to a temp file in the same directory, fsync it, then rename it over
+    # the target so readers only ever see the old or the new complete file
+    directory = os.path.dirname(os.path.abspath(path))
+    # Encoded in one go: json.dump streams through the pure-Python encoder
+    if indent is None:
+        text = json.dumps(data, separators=(",", ":"))
+    else:
+        text = json.dumps(data, indent=indent)
+
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=directory)
+    try:
+        match_file_mode(fd, path)
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    fsync_directory(directory)
+
+
+def match_file_mode(fd, path):
+    # mkstemp files are 0600 and the rename keeps that; give the replacement
+    # the target's mode, or the usual mode for a new file
+    if not hasattr(os, "fchmod"):
+        return  # Windows
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~UMASK
+    os.fchmod(fd, mode)
+
+
+def read_lines_reversed(path, block_size=64 * 1024):
+    # Yields the non-empty lines of a file as bytes, last to first, reading
+    # a block at a time from the end
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b""
+
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            lines = (f.read(step) + remainder).split(b"\n")
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                if line:
+                    yield line
+
+        if remainder:
+            yield remainder
+
+
+def fsync_directory(directory):
+    # Persist the rename itself; not supported on Windows
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class FileLock:
+    # Exclusive lock across processes, held on a separate lock file so the
+    # data file itself can still be replaced atomically. Re-entrant within
+    # a thread; other threads of the same process wait their turn.
+    def __init__(self, path):
+        self.path = path
+        self.thread_lock = threading.RLock()
+        self.depth = 0
+        self.fd = None
+
+    def acquire(self):
+        self.thread_lock.acquire()
+        self.depth += 1
+        if self.depth > 1:
+            return
+
+        try:
+            self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            if fcntl is not None:
+                fcntl.flock(self.fd, fcntl.LOCK_EX)
+            else:
+                while True:
+                    try:
+                        msvcrt.locking(self.fd, msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        pass  # LK_LOCK gives up after ~10s; keep waiting
+        except BaseException:
+            if self.fd is not None:
+                os.close(self.fd)
+                self.fd = None
+            self.depth -= 1
+            self.thread_lock.release()
+            raise
+
+    def release(self):
+        self.depth -= 1
+        if not self.depth:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self.fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(self.fd, 0, os.SEEK_SET)
+                    msvcrt.locking(self.fd, msvcrt.LK_UNLCK, 1)
+            finally:
+                os.close(self.fd)
+                self.fd = None
+        self.thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class IdSequence:
+    # Persistent high-water mark for allocating ids: the next free id is
+    # kept in a small file beside the data, so ids are never reused after a
+    # delete, and reservations from several processes never overlap.
+    def __init__(self, path):
+        self.path = path
+        self.lock = FileLock(path + ".lock")
+
+    def reserve(self, count, floor=1):
+        # Returns the first of `count` consecutive ids, none below `floor`
+        with self.lock:
+            try:
+                with open(self.path, "r") as f:
+                    next_id = json.load(f)["next_id"]
+            except FileNotFoundError:
+                next_id = floor
+
+            start = max(next_id, floor)
+            atomic_write_json(self.path, {"next_id": start + count})
+            return start
@@ -0,0 +1,229 @@
+import glob
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import atmLedger
+from atmLedger import MINIMUM_BALANCE, AccountStore, Ledger
+
+
+def open_store(directory, **options):
+    return AccountStore(os.path.join(directory, "atm_data.json"), **options)
+
+
+def make_ledger(directory, **options):
+    ledger = Ledger(open_store(directory, **options))
+    ledger.open_account("1", "1234", 1000)
+    ledger.open_account("2", "1234", 1000)
+    return ledger
+
+
+def history_seqs(store, account_id):
+    return [entry["seq"] for entry in store.history.between(account_id)]
+
+
+def test_torn_final_record_is_dropped_and_replay_continues(tmp_path):
+    ledger = make_ledger(tmp_path)
+    ledger.withdraw("1", 200)
+    ledger.deposit("2", 50)
+    ledger.close()
+
+    # A writer died halfway through its record
+    wal_path = str(tmp_path / "atm_data.wal")
+    with open(wal_path, "ab") as f:
+        f.write(b'{"seq":5,"account":"1","bala')
+
+    store = open_store(tmp_path)
+    assert store.get("1")["balance"] == 800
+    assert store.get("2")["balance"] == 1050
+    assert store.seq == 4
+    with open(wal_path, "rb") as f:
+        assert f.read().endswith(b"}\n")
+
+    # The next record starts on a clean line and survives a reopen
+    Ledger(store).withdraw("1", 100)
+    store.close()
+    store = open_store(tmp_path)
+    assert store.get("1")["balance"] == 700
+    assert history_seqs(store, "1") == [3, 5]
+    store.close()
+
+
+def test_log_already_in_the_snapshot_is_skipped(tmp_path):
+    ledger = make_ledger(tmp_path)
+    ledger.withdraw("1", 200)
+    ledger.deposit("1", 50)
+    with open(tmp_path / "atm_data.wal", "rb") as f:
+        log = f.read()
+    ledger.store.checkpoint()
+    seq = ledger.store.seq
+    ledger.close()
+
+    # Crash between writing the snapshot and deleting the sealed log
+    with open(f"{tmp_path / 'atm_data.wal'}.{seq}", "wb") as f:
+        f.write(log)
+
+    store = open_store(tmp_path)
+    assert store.get("1")["balance"] == 850
+    assert store.seq == seq
+    assert history_seqs(store, "1") == [3, 4]
+    store.close()
+    assert not glob.glob(str(tmp_path / "atm_data.wal.*"))
+
+
+def test_recovery_does_not_duplicate_history(tmp_path):
+    ledger = make_ledger(tmp_path)
+    for _ in range(3):
+        ledger.withdraw("1", 100)
+    # Died without closing: the log holds records already in the history
+    ledger.store.wal.close()
+
+    # ... and the newest record never reached the history
+    month_path = glob.glob(str(tmp_path / "atm_history" / "1" / "*.jsonl"))[0]
+    with open(month_path, "rb") as f:
+        lines = f.readlines()
+    with open(month_path, "wb") as f:
+        f.writelines(lines[:-1])
+
+    store = open_store(tmp_path)
+    assert history_seqs(store, "1") == [3, 4, 5]
+    store.close()
+    store = open_store(tmp_path)
+    assert history_seqs(store, "1") == [3, 4, 5]
+    assert store.get("1")["balance"] == 700
+    store.close()
+
+
+def test_log_is_compacted_by_size(tmp_path):
+    ledger = make_ledger(tmp_path, min_log_bytes=2000)
+    for _ in range(100):
+        ledger.deposit("1", 10)
+    ledger.close()
+
+    with open(tmp_path / "atm_data.json") as f:
+        snapshot = json.load(f)
+    assert snapshot["seq"] > 2
+    assert os.path.getsize(tmp_path / "atm_data.wal") < 2000 + 200
+    assert not glob.glob(str(tmp_path / "atm_data.wal.*"))
+
+    store = open_store(tmp_path)
+    assert store.get("1")["balance"] == 2000
+    assert len(history_seqs(store, "1")) == 100
+    store.close()
+
+
+def test_other_process_follows_a_sealed_log(tmp_path):
+    writer = make_ledger(tmp_path, min_log_bytes=1000)
+    reader = open_store(tmp_path)
+    for _ in range(10):
+        writer.deposit("1", 10)
+    assert reader.get("1")["balance"] == 1100
+
+    # Sealed and compacted away twice over while the reader looked away
+    for _ in range(60):
+        writer.deposit("1", 10)
+    writer.store.checkpoint()
+    assert reader.get("1")["balance"] == 1700
+    writer.close()
+    reader.close()
+
+
+def test_retried_request_is_applied_once(tmp_path):
+    ledger = make_ledger(tmp_path)
+    assert ledger.withdraw("1", 500, "req-1") == 500
+    assert ledger.withdraw("1", 500, "req-1") == 500
+    assert ledger.store.get("1")["balance"] == 500
+    ledger.close()
+
+
+@pytest.mark.parametrize("retry", [
+    lambda ledger: ledger.deposit("1", 300, "req-1"),
+    lambda ledger: ledger.withdraw("1", 300, "req-1"),
+    lambda ledger: ledger.withdraw("2", 500, "req-1"),
+])
+def test_request_id_reused_for_another_transaction_is_refused(tmp_path, retry):
+    ledger = make_ledger(tmp_path)
+    ledger.withdraw("1", 500, "req-1")
+    with pytest.raises(ValueError):
+        retry(ledger)
+    assert ledger.store.get("1")["balance"] == 500
+    assert ledger.store.get("2")["balance"] == 1000
+    ledger.close()
+
+
+def test_open_ledger_tolerates_a_terminal_starting_alongside(tmp_path, monkeypatch):
+    path = str(tmp_path / "atm_data.json")
+    contains = AccountStore.__contains__
+    checks = []
+
+    def racing_contains(store, account_id):
+        # The other terminal opens the account right after our first check
+        checks.append(account_id)
+        if len(checks) == 1:
+            other = atmLedger.open_ledger(path)
+            other.close()
+            return False
+        return contains(store, account_id)
+
+    monkeypatch.setattr(AccountStore, "__contains__", racing_contains)
+    ledger = atmLedger.open_ledger(path)
+    monkeypatch.undo()
+    assert ledger.balance(atmLedger.DEFAULT_ACCOUNT) == 1000
+    ledger.close()
+
+
+def withdraw_concurrently(directory, threads, requests):
+    # One terminal process: every thread sends each request twice, as a
+    # client retrying after a timeout would. Returns {request id: balance}
+    # for the requests that went through.
+    ledger = Ledger(open_store(directory, min_log_bytes=2000))
+    results = {}
+
+    def run(thread_index):
+        for i in range(requests):
+            request_id = f"req-{thread_index}-{i}"
+            for _ in range(2):
+                try:
+                    results[request_id] = ledger.withdraw("1", 100, request_id)
+                except ValueError:
+                    pass  # insufficient funds
+
+    workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    ledger.close()
+    return results
+
+
+def test_concurrent_withdrawals_keep_the_minimum_balance(tmp_path):
+    # 3 processes x 2 threads send the same 2 x 25 request ids, with funds
+    # for 40 of them
+    ledger = Ledger(open_store(tmp_path))
+    ledger.open_account("1", "1234", MINIMUM_BALANCE + 40 * 100)
+    ledger.close()
+
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(max_workers=3, mp_context=context) as executor:
+        futures = [executor.submit(withdraw_concurrently, str(tmp_path), 2, 25) for _ in range(3)]
+        results = [future.result() for future in futures]
+
+    # Every process saw the same outcome for a request id
+    outcomes = {}
+    for result in results:
+        for request_id, balance in result.items():
+            assert outcomes.setdefault(request_id, balance) == balance
+    assert len(outcomes) == 40
+    assert sorted(outcomes.values()) == [MINIMUM_BALANCE + i * 100 for i in range(40)]
+
+    store = open_store(tmp_path)
+    assert store.get("1")["balance"] == MINIMUM_BALANCE
+    debits = [entry for entry in store.history.between("1") if entry["amount"] < 0]
+    assert len(debits) == 40
+    assert len({entry["seq"] for entry in debits}) == 40
+    store.close()
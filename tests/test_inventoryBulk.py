@@ -0,0 +1,45 @@
+import json
+import os
+import stat
+
+import pytest
+
+from inventoryBulk import export_products, import_products
+from inventoryStore import InventoryRepository, TransactionJournal
+
+
+def make_repository(tmp_path, count=10):
+    products = [{"id": i, "name": f"Product {i}", "category": "General", "price": 2.5, "quantity": i,
+                 "min_stock": 1, "description": "", "last_updated": "2026-01-01 00:00:00"}
+                for i in range(1, count + 1)]
+    path = tmp_path / "inventory.json"
+    path.write_text(json.dumps(products))
+    return InventoryRepository(str(path))
+
+
+@pytest.mark.skipif(not hasattr(os, "fchmod"), reason="file modes are POSIX only")
+def test_export_keeps_existing_mode(tmp_path):
+    repository = make_repository(tmp_path)
+    target = tmp_path / "export.csv"
+    target.write_text("")
+    os.chmod(target, 0o644)
+
+    assert export_products(repository, str(target)) == 10
+    assert stat.S_IMODE(os.stat(target).st_mode) == 0o644
+
+
+def test_import_skips_malformed_json_line(tmp_path):
+    repository = make_repository(tmp_path, count=0)
+    journal = TransactionJournal(str(tmp_path / "transactions.jsonl"), legacy_path=None)
+    rows = [json.dumps({"name": f"Imported {i}", "category": "General", "price": 1, "quantity": i,
+                        "min_stock": 0}) for i in range(6)]
+    rows[3:3] = ['{"name": "Broken", "price": ', '["not", "an", "object"]']
+    source = tmp_path / "products.jsonl"
+    source.write_text("\n".join(rows) + "\n")
+
+    result = import_products(repository, journal, str(source), batch_size=2)
+    journal.close()
+
+    assert result["imported"] == 6
+    assert result["errors"] == [(4, "invalid JSON"), (5, "expected a JSON object")]
+    assert sorted(p["name"] for p in repository.all()) == [f"Imported {i}" for i in range(6)]
@@ -0,0 +1,47 @@
+import json
+import os
+
+import numpy as np
+
+from inventoryReports import InventorySnapshot, value_report
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_products(prices, quantities):
+    return [{"id": i + 1, "name": f"Product {i + 1}", "category": "General", "price": float(price),
+             "quantity": int(quantity), "min_stock": 1}
+            for i, (price, quantity) in enumerate(zip(prices, quantities))]
+
+
+def histogram_total(snapshot, bins=20):
+    report = value_report(snapshot, {"value_mode": "histogram", "top": 20, "bins": bins})
+    return sum(row[2] for row in report["rows"]), report["stats"]
+
+
+def test_histogram_counts_every_product_in_shipped_inventory():
+    with open(os.path.join(REPO, "inventory.json")) as f:
+        products = json.load(f)
+    snapshot = InventorySnapshot(products)
+
+    total, stats = histogram_total(snapshot)
+    assert total + stats["unvalued"] == stats["count"] == len(products)
+
+
+def test_histogram_counts_every_valued_product():
+    rng = np.random.default_rng(7)
+    for _ in range(200):
+        count = int(rng.integers(1, 50))
+        prices = np.round(rng.uniform(0.01, 5000, count), 2)
+        quantities = rng.integers(0, 100, count)
+        snapshot = InventorySnapshot(make_products(prices, quantities))
+
+        total, stats = histogram_total(snapshot, int(rng.integers(1, 30)))
+        assert total == int(np.count_nonzero(prices * quantities > 0))
+        assert total + stats["unvalued"] == stats["count"]
+
+
+def test_histogram_single_value():
+    snapshot = InventorySnapshot(make_products([540.0, 540.0, 3.0], [1, 1, 0]))
+    total, stats = histogram_total(snapshot)
+    assert total == 2 and stats["unvalued"] == 1
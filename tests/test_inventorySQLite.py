@@ -0,0 +1,120 @@
+import json
+import os
+import threading
+
+import pytest
+
+import inventorySQLite
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def products():
+    with open(os.path.join(REPO, "inventory.json")) as f:
+        return json.load(f)
+
+
+def write_inventory(tmp_path, products):
+    path = tmp_path / "inventory.json"
+    path.write_text(json.dumps(products))
+    return str(path)
+
+
+def import_twice(tmp_path, first, second):
+    conn = inventorySQLite.connect(str(tmp_path / "inventory.db"))
+    inventorySQLite.import_json(conn, write_inventory(tmp_path, first), None, None)
+    inventorySQLite.import_json(conn, write_inventory(tmp_path, second), None, None)
+    return conn
+
+
+def test_reimport_keeps_full_text_index_consistent(tmp_path, products):
+    renamed = [dict(p) for p in products]
+    renamed[0]["name"] = "Zanzibar Gadget"
+    old_name = products[0]["name"]
+
+    conn = import_twice(tmp_path, products, renamed)
+    repository = inventorySQLite.SQLiteInventoryRepository(conn)
+
+    conn.execute("INSERT INTO products_fts (products_fts) VALUES ('integrity-check')")
+    assert repository.search("Zanzibar") == [renamed[0]["id"]]
+    assert renamed[0]["id"] not in repository.search(old_name)
+    conn.close()
+
+
+def expected_totals(products):
+    counts, value = {}, 0.0
+    for p in products:
+        counts[p["category"]] = counts.get(p["category"], 0) + 1
+        value += p["price"] * p["quantity"]
+    return counts, value
+
+
+@pytest.mark.parametrize("change", [False, True])
+def test_reimport_keeps_category_totals(tmp_path, products, change):
+    second = [dict(p) for p in products]
+    if change:
+        second[0]["category"] = "Imported"
+        second[1]["price"] = second[1]["price"] * 2
+
+    conn = import_twice(tmp_path, products, second)
+    repository = inventorySQLite.SQLiteInventoryRepository(conn)
+
+    counts, value = expected_totals(second)
+    assert repository.category_counts() == counts
+    assert repository.count() == len(second)
+    assert repository.total_value() == pytest.approx(value)
+    conn.close()
+
+
+def test_worker_threads_get_their_own_connection(tmp_path, products):
+    repository, journal, _ = inventorySQLite.open_backend(
+        str(tmp_path / "inventory.db"), write_inventory(tmp_path, products),
+        str(tmp_path / "transactions.jsonl"), str(tmp_path / "users.json"))
+    product_id = products[0]["id"]
+    seen = {}
+
+    def worker():
+        seen["product"] = repository.get(product_id)
+        seen["version"] = repository.data_version()
+
+    # A worker reading while the UI thread is inside a write transaction
+    # sees the last committed state, not the uncommitted change
+    version = repository.data_version()
+    with repository.writing():
+        repository.conn.execute("UPDATE products SET quantity = 999 WHERE id = ?", (product_id,))
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+    assert seen["product"]["quantity"] == products[0]["quantity"]
+    assert seen["version"] == version
+    assert repository.data_version() != version
+
+    # Writes from a worker thread are seen by the UI thread's connection
+    thread = threading.Thread(target=lambda: repository.adjust_stock(product_id, 1))
+    thread.start()
+    thread.join()
+    assert repository.get(product_id)["quantity"] == 1000
+    journal.close()
+
+
+@pytest.mark.parametrize("name", ["transactions.json", "transactions.jsonl"])
+def test_reimport_does_not_duplicate_transactions(tmp_path, name):
+    with open(os.path.join(REPO, "transactions.json")) as f:
+        transactions = json.load(f)
+    # Identical entries in the same second are both kept
+    transactions.append(dict(transactions[-1]))
+
+    path = tmp_path / name
+    if name.endswith(".jsonl"):
+        path.write_text("".join(json.dumps(entry) + "\n" for entry in transactions))
+    else:
+        path.write_text(json.dumps(transactions))
+
+    conn = inventorySQLite.connect(str(tmp_path / "inventory.db"))
+    inventorySQLite.import_json(conn, None, str(path), None)
+    inventorySQLite.import_json(conn, None, str(path), None)
+
+    assert conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0] == len(transactions)
+    conn.close()
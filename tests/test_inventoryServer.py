@@ -0,0 +1,48 @@
+import json
+import socket
+import threading
+
+import pytest
+
+from inventoryServer import InventoryClient, InventoryService
+from inventoryStore import UserStore
+
+
+def test_client_reconnects_after_a_timeout():
+    listener = socket.create_server(("127.0.0.1", 0))
+    held = []
+
+    def serve():
+        # The first connection never gets a reply; the second one does
+        first, _ = listener.accept()
+        held.append(first)
+        second, _ = listener.accept()
+        with second, second.makefile("rwb") as f:
+            f.readline()
+            f.write(json.dumps({"result": 7}).encode("utf-8") + b"\n")
+            f.flush()
+
+    server = threading.Thread(target=serve)
+    server.start()
+    client = InventoryClient(*listener.getsockname(), timeout=0.2)
+    try:
+        with pytest.raises(socket.timeout):
+            client.count()
+        assert client.count() == 7
+    finally:
+        client.close()
+        server.join()
+        for conn in held:
+            conn.close()
+        listener.close()
+
+
+def test_service_checks_passwords_without_revealing_them(tmp_path):
+    users_path = tmp_path / "users.json"
+    users_path.write_text(json.dumps({"admin": "admin123"}))
+    service = InventoryService(None, None, UserStore(str(users_path)))
+
+    assert service.handle({"method": "users.check_password", "params": ["admin", "admin123"]}) == {"result": True}
+    assert service.handle({"method": "users.check_password", "params": ["admin", "nope"]}) == {"result": False}
+    assert service.handle({"method": "users.check_password", "params": ["nobody", "x"]}) == {"result": False}
+    assert "error" in service.handle({"method": "users.password_for", "params": ["admin"]})
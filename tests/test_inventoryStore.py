@@ -0,0 +1,78 @@
+import json
+import sys
+import threading
+
+import pytest
+
+from inventoryStore import InventoryRepository, SearchIndex
+
+
+def make_inventory(tmp_path, count=2000):
+    products = [{"id": i, "name": f"Product {i}", "category": f"Category {i % 7}", "price": 1.5,
+                 "quantity": i % 13, "min_stock": 5, "description": "", "last_updated": "2026-01-01 00:00:00"}
+                for i in range(1, count + 1)]
+    path = tmp_path / "inventory.json"
+    path.write_text(json.dumps(products))
+    return str(path)
+
+
+def test_reads_from_threads_during_reloads(tmp_path):
+    # Another process's writes make every reader thread reload the file
+    path = make_inventory(tmp_path)
+    repository = InventoryRepository(path)
+    other_process = InventoryRepository(path)
+    errors = []
+    done = threading.Event()
+    # Switch threads often, so unguarded reloads would interleave
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+
+    def read():
+        try:
+            while not done.is_set():
+                repository.count()
+                repository.category_summary()
+                repository.low_stock_items(10)
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    for i in range(30):
+        other_process.apply_stock_movements([(i + 1, 1)])
+    done.set()
+    for reader in readers:
+        reader.join()
+    sys.setswitchinterval(interval)
+
+    assert not errors
+    products = repository.all()
+    assert repository.count() == len(products) == 2000
+    assert repository.total_value() == pytest.approx(sum(p["price"] * p["quantity"] for p in products))
+    assert sum(totals["count"] for totals in repository.category_summary().values()) == len(products)
+    assert repository.low_stock_count() == sum(1 for p in products if p["quantity"] <= p["min_stock"])
+
+
+def test_search_index_bulk_build_matches_incremental_adds():
+    products = [{"id": i, "name": f"Widget {i} model{i % 17}", "category": ["Tools", "Garden"][i % 2],
+                 "description": f"part{i % 5}"} for i in range(1, 300)]
+    built = SearchIndex(products)
+    added = SearchIndex()
+    for product in products:
+        added.add(product)
+
+    assert built.sorted_tokens == added.sorted_tokens == sorted(built.postings)
+    for query in ["widget", "mod", "model3 tools", "garden part2", "12", "zzz"]:
+        assert built.search(query) == added.search(query)
+
+
+def test_search_matches_product_ids_directly():
+    index = SearchIndex([{"id": 12, "name": "Hammer", "category": "Tools", "description": ""},
+                         {"id": 120, "name": "Saw", "category": "Tools", "description": "fits 12 mm"}])
+    assert index.search("12") == [12, 120]
+    assert index.search("120") == [120]
+    assert "12" not in index.postings or 12 not in index.postings["12"]
+
+    index.remove(12)
+    assert index.search("12") == [120]
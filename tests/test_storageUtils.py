@@ -0,0 +1,50 @@
+import json
+import os
+import stat
+
+import pytest
+
+from storageUtils import UMASK, atomic_write_json, read_lines_reversed
+
+posix_modes = pytest.mark.skipif(not hasattr(os, "fchmod"), reason="file modes are POSIX only")
+
+
+def file_mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+@posix_modes
+def test_atomic_write_keeps_existing_mode(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text("[]")
+    os.chmod(path, 0o664)
+
+    atomic_write_json(str(path), [1, 2, 3])
+    assert file_mode(path) == 0o664
+    assert json.loads(path.read_text()) == [1, 2, 3]
+
+    atomic_write_json(str(path), {"a": 1}, indent=2)
+    assert file_mode(path) == 0o664
+    assert json.loads(path.read_text()) == {"a": 1}
+
+
+@posix_modes
+def test_atomic_write_new_file_uses_umask(tmp_path):
+    path = tmp_path / "new.json"
+    atomic_write_json(str(path), [])
+    assert file_mode(path) == 0o666 & ~UMASK
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 7, 64 * 1024])
+def test_read_lines_reversed(tmp_path, block_size):
+    path = tmp_path / "lines.txt"
+    lines = [("x" * i).encode() for i in range(1, 30)]
+    path.write_bytes(b"\n".join(lines[:10]) + b"\n\n" + b"\n".join(lines[10:]))
+
+    assert list(read_lines_reversed(str(path), block_size)) == lines[::-1]
+
+
+def test_read_lines_reversed_empty_file(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    assert list(read_lines_reversed(str(path))) == []